@@ -1,19 +1,32 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, send_file
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, send_file, g, has_app_context
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime, timedelta  # Add timedelta to the import
 import os
 import sys  # Add the sys import
 import pandas as pd
 from werkzeug.utils import secure_filename
+import contextlib
+import csv
 import io
+import json
 import logging
+import multiprocessing
+import queue
+import socket
+import shutil
+import tempfile
+import time
+import uuid
+import zipfile
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.urls import url_parse
 import flask  # Import flask module to access version information
 import sqlalchemy  # Import sqlalchemy module to access version information
 from dotenv import load_dotenv
-from sqlalchemy.exc import OperationalError
+from sqlalchemy.exc import OperationalError, StatementError
 from render_optimizations import optimize_for_render
 
 # Remove the circular import
@@ -38,8 +51,50 @@ if database_url.startswith('postgres://'):
 app.config['SQLALCHEMY_DATABASE_URI'] = database_url
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['UPLOAD_FOLDER'] = 'uploads'
-app.config['ALLOWED_EXTENSIONS'] = {'xlsx', 'xls', 'csv'}
+app.config['ALLOWED_EXTENSIONS'] = {'xlsx', 'xls', 'csv', 'zip'}
 app.config['SITE_NAME'] = 'Span Freight'  # Add site name config
+# Background vessel ETA check: seconds between runs, and whether web processes run it themselves
+app.config['VESSEL_STATUS_INTERVAL'] = int(os.environ.get('VESSEL_STATUS_INTERVAL', 300))
+app.config['SCHEDULER_ENABLED'] = os.environ.get('SCHEDULER_ENABLED', 'true').lower() not in ('0', 'false', 'no', 'off')
+
+# Container imports: rows written per batch (one commit each), seconds between checks
+# for queued jobs, seconds a running job may go without progress before another
+# worker takes it over, and whether web processes run queued jobs themselves
+app.config['IMPORT_BATCH_SIZE'] = int(os.environ.get('IMPORT_BATCH_SIZE', 2000))
+# The batch size then adapts so each batch takes about IMPORT_BATCH_TARGET_SECONDS, within these bounds
+app.config['IMPORT_BATCH_MIN_SIZE'] = int(os.environ.get('IMPORT_BATCH_MIN_SIZE', 100))
+app.config['IMPORT_BATCH_MAX_SIZE'] = int(os.environ.get('IMPORT_BATCH_MAX_SIZE', 20000))
+app.config['IMPORT_BATCH_TARGET_SECONDS'] = float(os.environ.get('IMPORT_BATCH_TARGET_SECONDS', 2.0))
+app.config['IMPORT_POLL_INTERVAL'] = int(os.environ.get('IMPORT_POLL_INTERVAL', 5))
+app.config['IMPORT_JOB_STALE_AFTER'] = int(os.environ.get('IMPORT_JOB_STALE_AFTER', 180))
+# Import jobs run in worker.py; a thread in the web process only runs them when explicitly enabled,
+# since it shares the web worker's GIL and is cut off when gunicorn recycles the worker
+app.config['IMPORT_WORKER_ENABLED'] = os.environ.get('IMPORT_WORKER_ENABLED', 'false').lower() in ('1', 'true', 'yes', 'on')
+# On PostgreSQL, imports stream batches through COPY into a staging table and insert with set-based SQL
+app.config['IMPORT_COPY_ENABLED'] = os.environ.get('IMPORT_COPY_ENABLED', 'true').lower() not in ('0', 'false', 'no', 'off')
+app.config['IMPORT_COPY_BATCH_SIZE'] = int(os.environ.get('IMPORT_COPY_BATCH_SIZE', 50000))
+# Uploads are held in memory up to IMPORT_SPOOL_MAX_BYTES while the request is read (then spill to
+# /dev/shm), and saved to the upload folder from there without an extra temporary file
+app.config['IMPORT_SPOOL_MAX_BYTES'] = int(os.environ.get('IMPORT_SPOOL_MAX_BYTES', 16 * 1024 * 1024))
+# Processes that read and normalize the files/sheets of a multi-file import in parallel
+app.config['IMPORT_PARSE_WORKERS'] = int(os.environ.get('IMPORT_PARSE_WORKERS', min(4, os.cpu_count() or 1)))
+
+# RAM-backed tmpfs where available, so spilled uploads still stay off the disk
+UPLOAD_SPOOL_DIR = '/dev/shm' if os.access('/dev/shm', os.W_OK) else None
+
+class SpooledUploadRequest(flask.Request):
+    """Request whose file uploads are kept in a spooled in-memory buffer.
+
+    Werkzeug's default writes anything over 500KB to a temporary file on
+    disk; here uploads stay in memory up to IMPORT_SPOOL_MAX_BYTES and only
+    larger ones spill over, to /dev/shm when it is there.
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return tempfile.SpooledTemporaryFile(max_size=app.config['IMPORT_SPOOL_MAX_BYTES'],
+                                             mode='rb+', dir=UPLOAD_SPOOL_DIR)
+
+app.request_class = SpooledUploadRequest
 
 # Database configuration - update to handle Render.com environment
 if os.environ.get('RENDER_PERSISTENT_STORAGE_PATH'):
@@ -109,6 +164,9 @@ class Container(db.Model):
     # Add composite unique constraint for container_number + bl_number
     __table_args__ = (
         db.UniqueConstraint('container_number', 'bl_number', name='uix_container_number_bl'),
+        db.Index('ix_container_client_id', 'client_id'),
+        db.Index('ix_container_arrival_date', 'arrival_date'),
+        db.Index('ix_container_created_at', 'created_at'),
     )
     
     def __repr__(self):
@@ -116,6 +174,9 @@ class Container(db.Model):
     
     def get_current_status(self):
         """Get the most recent status for this container"""
+        prefetched = _prefetched_state(self.id)
+        if prefetched is not None:
+            return prefetched['status']
         # Use created_at instead of date for sorting
         latest_status = ContainerStatus.query.filter_by(container_id=self.id).order_by(ContainerStatus.created_at.desc()).first()
         return latest_status
@@ -127,9 +188,13 @@ class Container(db.Model):
             return None
         
         # Check if container is on a vessel - use created_at instead of operation_date
-        latest_movement = ContainerMovement.query.filter_by(
-            container_id=self.id
-        ).order_by(ContainerMovement.created_at.desc()).first()
+        prefetched = _prefetched_state(self.id)
+        if prefetched is not None:
+            latest_movement = prefetched['movement']
+        else:
+            latest_movement = ContainerMovement.query.filter_by(
+                container_id=self.id
+            ).order_by(ContainerMovement.created_at.desc()).first()
         
         if not latest_movement:
             return {"type": "port", "location": current_status.location, "since": current_status.date}
@@ -147,6 +212,10 @@ class Container(db.Model):
 
     def is_on_departed_vessel(self):
         """Check if the container is on a vessel that has departed"""
+        # Read the precomputed flag when the state row exists
+        state = db.session.get(ContainerCurrentState, self.id)
+        if state is not None:
+            return state.on_departed_vessel
         current_location = self.get_current_location()
         if (current_location and current_location['type'] == 'vessel'):
             vessel = current_location['vessel']
@@ -162,6 +231,10 @@ class Container(db.Model):
         
     def get_last_vessel(self):
         """Get the most recent vessel this container was on (for discharged containers)"""
+        prefetched = _prefetched_state(self.id)
+        if prefetched is not None:
+            return prefetched['last_vessel']
+        
         # Find the most recent discharge movement
         latest_discharge = ContainerMovement.query.filter_by(
             container_id=self.id,
@@ -234,6 +307,11 @@ class ContainerStatus(db.Model):
     # Foreign Key
     container_id = db.Column(db.Integer, db.ForeignKey('container.id'), nullable=False)
     
+    # Latest-status-per-container lookups
+    __table_args__ = (
+        db.Index('ix_container_status_container_id_created_at', 'container_id', 'created_at'),
+    )
+    
     def __repr__(self):
         return f"ContainerStatus('{self.status}', '{self.date}')"
 
@@ -252,26 +330,53 @@ class Vessel(db.Model):
     # Relationship with ContainerMovement
     container_movements = db.relationship('ContainerMovement', backref='vessel', lazy=True)
     
+    __table_args__ = (
+        db.Index('ix_vessel_eta', 'eta'),
+    )
+    
     def __repr__(self):
         return f"Vessel('{self.name}', Voyage: '{self.imo_number}')"
     
     def get_loaded_containers(self):
-        """Get containers currently loaded on this vessel"""
-        # Find containers that were loaded but not yet discharged
-        loaded_containers = []
-        container_ids = set()
-        # Get all movements for this vessel ordered by container ID and created_at (newest first)
-        movements = ContainerMovement.query.filter_by(vessel_id=self.id).order_by(
-            ContainerMovement.container_id, ContainerMovement.created_at.desc()
-        ).all()
-        for movement in movements:
-            # Only check each container once (its most recent movement)
-            if movement.container_id not in container_ids:
-                container_ids.add(movement.container_id)
-                # If the most recent movement is 'load', the container is still on the vessel
-                if movement.operation_type == 'load':
-                    loaded_containers.append(movement.container)
-        return loaded_containers
+        """Get containers currently loaded on this vessel (one query, ordered by container id)"""
+        return Container.query.filter(
+            Container.id.in_(self.loaded_container_ids_select())
+        ).order_by(Container.id).all()
+    
+    def count_loaded_containers(self):
+        """Count containers currently loaded on this vessel without loading them"""
+        loaded = self.loaded_container_ids_select().subquery()
+        return db.session.scalar(db.select(db.func.count()).select_from(loaded))
+    
+    def loaded_container_ids_select(self):
+        """SELECT of container ids whose latest movement on this vessel is a load"""
+        # Rank each container's movements on this vessel, newest first
+        ranked = db.select(
+            ContainerMovement.container_id,
+            ContainerMovement.operation_type,
+            db.func.row_number().over(
+                partition_by=ContainerMovement.container_id,
+                order_by=(ContainerMovement.created_at.desc(), ContainerMovement.id.desc())
+            ).label('position')
+        ).where(ContainerMovement.vessel_id == self.id).subquery()
+        return db.select(ranked.c.container_id).where(
+            ranked.c.position == 1,
+            ranked.c.operation_type == 'load'
+        )
+    
+    def propagate_arrival_date(self, arrival_date):
+        """Set arrival_date on every container still loaded on this vessel with one UPDATE.
+
+        Returns the number of containers updated. Container objects already in the
+        session are not refreshed until the next commit expires them.
+        """
+        result = db.session.execute(
+            db.update(Container)
+            .where(Container.id.in_(self.loaded_container_ids_select()))
+            .values(arrival_date=arrival_date)
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount
 
 class ContainerMovement(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -284,6 +389,13 @@ class ContainerMovement(db.Model):
     container_id = db.Column(db.Integer, db.ForeignKey('container.id'), nullable=False)
     vessel_id = db.Column(db.Integer, db.ForeignKey('vessel.id'), nullable=False)
     
+    # Latest movement per container (overall and per vessel) and date-range reports
+    __table_args__ = (
+        db.Index('ix_container_movement_container_id_created_at', 'container_id', 'created_at'),
+        db.Index('ix_container_movement_vessel_container_created', 'vessel_id', 'container_id', 'created_at'),
+        db.Index('ix_container_movement_operation_type_date', 'operation_type', 'operation_date'),
+    )
+    
     def __repr__(self):
         return f"ContainerMovement('{self.operation_type}', '{self.operation_date}')"
 
@@ -370,18 +482,509 @@ class Client(db.Model):
         """Get count of containers associated with this client"""
         return Container.query.filter_by(client_id=self.id).count()
 
+# Read model with one row per container holding its latest state.
+# Kept in sync with ContainerStatus/ContainerMovement by the session listeners
+# below, so list/filter/count paths don't have to re-derive state from history.
+class ContainerCurrentState(db.Model):
+    __tablename__ = 'container_current_state'
+
+    container_id = db.Column(db.Integer, db.ForeignKey('container.id', ondelete='CASCADE'), primary_key=True)
+    status_id = db.Column(db.Integer)  # Latest ContainerStatus row
+    movement_id = db.Column(db.Integer)  # Latest ContainerMovement row
+    status = db.Column(db.String(20))
+    location = db.Column(db.String(100))  # Already mapped through map_location_codes
+    status_date = db.Column(db.DateTime)
+    # Vessel ids are plain columns (no FK) so deleting a vessel never has to wait for this table
+    current_vessel_id = db.Column(db.Integer)
+    on_departed_vessel = db.Column(db.Boolean, nullable=False, default=False)
+    last_vessel_id = db.Column(db.Integer)  # Vessel of the most recent discharge
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_container_current_state_location_status', 'location', 'status'),
+        # Status filters across every location (bulk actions with no location) can't use the one above
+        db.Index('ix_container_current_state_status', 'status'),
+        db.Index('ix_container_current_state_current_vessel_id', 'current_vessel_id'),
+    )
+
+    def __repr__(self):
+        return f"ContainerCurrentState({self.container_id}, '{self.status}', '{self.location}')"
+
+# Lease-style lock rows so only one process or node runs a scheduled job at a time.
+# The holder renews its lease on every run; if it dies the lease expires and
+# another process takes over.
+class SchedulerLock(db.Model):
+    __tablename__ = 'scheduler_lock'
+
+    name = db.Column(db.String(100), primary_key=True)
+    owner = db.Column(db.String(200), nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+    def __repr__(self):
+        return f"SchedulerLock('{self.name}', '{self.owner}', {self.expires_at})"
+
+# Uploaded container import files, processed in the background by the import runner.
+# Progress is written in the same transaction as each imported batch, so a job
+# picked up again after its worker died resumes right after the last committed row.
+class ImportJob(db.Model):
+    __tablename__ = 'import_job'
+
+    id = db.Column(db.Integer, primary_key=True)
+    filename = db.Column(db.String(255), nullable=False)  # Name of the uploaded file
+    stored_name = db.Column(db.String(300))  # File name in the upload folder
+    sheet_name = db.Column(db.String(100))  # Excel sheet to import (default: the first one)
+    skip_rows = db.Column(db.Integer, nullable=False, default=0)  # Title rows above the header
+    all_sheets = db.Column(db.Boolean, nullable=False, default=False)  # Import every sheet of each workbook
+    dry_run = db.Column(db.Boolean, nullable=False, default=False)  # Validate only, write nothing
+    # insert: skip containers already imported with the same BL; upsert: update them
+    mode = db.Column(db.String(20), nullable=False, default='insert')
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, completed, failed
+    created_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    # Worker holding the job and when it last reported progress
+    worker = db.Column(db.String(200))
+    heartbeat_at = db.Column(db.DateTime)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    # Progress counters
+    total_rows = db.Column(db.Integer)
+    rows_parsed = db.Column(db.Integer, nullable=False, default=0)
+    rows_inserted = db.Column(db.Integer, nullable=False, default=0)
+    rows_skipped = db.Column(db.Integer, nullable=False, default=0)
+    rows_updated = db.Column(db.Integer, nullable=False, default=0)
+    rows_unchanged = db.Column(db.Integer, nullable=False, default=0)
+    rows_failed = db.Column(db.Integer, nullable=False, default=0)  # Rows the database rejected
+    failed_rows = db.Column(db.Text)  # JSON list of the first failed rows with their error
+    clients_created = db.Column(db.Integer, nullable=False, default=0)
+    has_status = db.Column(db.Boolean, nullable=False, default=False)
+    vessels_not_found = db.Column(db.Text)  # JSON list of vessel names
+    # Files/sheets in the upload, and the ones left out (JSON list of source and error)
+    source_count = db.Column(db.Integer, nullable=False, default=1)
+    skipped_sources = db.Column(db.Text)
+    error_message = db.Column(db.Text)
+    # Dry runs: problems found and the per-row report (CSV in the upload folder)
+    error_count = db.Column(db.Integer, nullable=False, default=0)
+    warning_count = db.Column(db.Integer, nullable=False, default=0)
+    report_name = db.Column(db.String(300))
+
+    # The runner looks for the oldest queued (or stalled) job
+    __table_args__ = (
+        db.Index('ix_import_job_status_id', 'status', 'id'),
+    )
+
+    def file_path(self):
+        if not self.stored_name:
+            return None
+        return os.path.join(app.root_path, app.config['UPLOAD_FOLDER'], self.stored_name)
+
+    def report_path(self):
+        if not self.report_name:
+            return None
+        return os.path.join(app.root_path, app.config['UPLOAD_FOLDER'], self.report_name)
+
+    def import_stats(self):
+        """Counters in the form import_containers_file() keeps them, to resume from"""
+        return {
+            'total_rows': self.total_rows,
+            'rows_parsed': self.rows_parsed or 0,
+            'rows_inserted': self.rows_inserted or 0,
+            'rows_skipped': self.rows_skipped or 0,
+            'rows_updated': self.rows_updated or 0,
+            'rows_unchanged': self.rows_unchanged or 0,
+            'rows_failed': self.rows_failed or 0,
+            'failed_rows': json.loads(self.failed_rows or '[]'),
+            'clients_created': self.clients_created or 0,
+            'has_status': bool(self.has_status),
+            'vessels_not_found': set(json.loads(self.vessels_not_found or '[]')),
+            'source_count': self.source_count or 1,
+            'skipped_sources': json.loads(self.skipped_sources or '[]'),
+            'error_count': self.error_count or 0,
+            'warning_count': self.warning_count or 0,
+        }
+
+    def eta_seconds(self):
+        """Rough time left, from the average rate since the job started"""
+        if self.status != 'running' or not self.total_rows or not self.rows_parsed or not self.started_at:
+            return None
+        elapsed = (datetime.utcnow() - self.started_at).total_seconds()
+        return max(0, round(elapsed / self.rows_parsed * (self.total_rows - self.rows_parsed)))
+
+    def messages(self):
+        """Result messages as (category, text) pairs, worded like the old flash messages"""
+        if self.status == 'failed':
+            return [('danger', f'Error processing file: {self.error_message}')]
+        if self.status != 'completed':
+            return []
+        if self.dry_run:
+            messages = [('info', f'Validation finished, nothing was written: {self.rows_inserted} rows would be '
+                                 f'imported and {self.rows_skipped} rejected. Found {self.error_count} errors '
+                                 f'and {self.warning_count} warnings.')]
+            if self.mode == 'upsert':
+                messages.append(('info', f'{self.rows_updated} rows match existing containers and would update '
+                                         'them where fields changed.'))
+            if self.clients_created > 0:
+                messages.append(('info', f'{self.clients_created} new clients would be created.'))
+            messages.extend(self.skipped_source_messages())
+            if self.error_count or self.warning_count:
+                messages.append(('warning', 'Download the report for the row, column and suggested fix '
+                                            'of each problem.'))
+            return messages
+        status_msg = " Status information was also imported." if self.has_status else ""
+        client_msg = f" {self.clients_created} new clients were created." if self.clients_created > 0 else ""
+        if self.mode == 'upsert':
+            messages = [('success', f'Successfully imported {self.rows_inserted} new containers and updated '
+                                    f'{self.rows_updated} existing ones ({self.rows_unchanged} unchanged).'
+                                    f'{status_msg}{client_msg} {self.rows_skipped} rows were skipped as duplicates or for '
+                                    f'a missing container number or type.')]
+        else:
+            messages = [('success', f'Successfully imported {self.rows_inserted} containers.{status_msg}{client_msg} '
+                                    f'{self.rows_skipped} rows were skipped as duplicates or for a missing '
+                                    f'container number or type.')]
+        if self.rows_failed:
+            failed_rows = json.loads(self.failed_rows or '[]')
+            details = '; '.join(f"{failed['source'] + ' ' if failed.get('source') else ''}row {failed['row']} "
+                                f"({failed['container_number']}): {failed['error']}" for failed in failed_rows[:10])
+            more = ' (see the log for the rest)' if self.rows_failed > 10 else ''
+            messages.append(('warning', f'{self.rows_failed} rows could not be saved and were left out: '
+                                        f'{details}{more}'))
+        messages.extend(self.skipped_source_messages())
+        vessels_not_found = json.loads(self.vessels_not_found or '[]')
+        if vessels_not_found:
+            messages.append(('warning', f'Warning: Some vessels were not found in the system: {", ".join(vessels_not_found)}. '
+                                        'Please add these vessels first.'))
+        return messages
+
+    def skipped_source_messages(self):
+        skipped_sources = json.loads(self.skipped_sources or '[]')
+        if not skipped_sources:
+            return []
+        details = '; '.join(f"{skipped['source']}: {skipped['error']}" for skipped in skipped_sources)
+        return [('warning', f'{len(skipped_sources)} of {self.source_count} files/sheets were left out: {details}')]
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'filename': self.filename,
+            'source_count': self.source_count,
+            'status': self.status,
+            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S') if self.created_at else None,
+            'started_at': self.started_at.strftime('%Y-%m-%d %H:%M:%S') if self.started_at else None,
+            'finished_at': self.finished_at.strftime('%Y-%m-%d %H:%M:%S') if self.finished_at else None,
+            'total_rows': self.total_rows,
+            'rows_parsed': self.rows_parsed,
+            'rows_inserted': self.rows_inserted,
+            'rows_skipped': self.rows_skipped,
+            'rows_updated': self.rows_updated,
+            'rows_unchanged': self.rows_unchanged,
+            'rows_failed': self.rows_failed,
+            'clients_created': self.clients_created,
+            'mode': self.mode,
+            'dry_run': bool(self.dry_run),
+            'error_count': self.error_count,
+            'warning_count': self.warning_count,
+            'report_url': url_for('import_job_report', id=self.id)
+                          if self.status == 'completed' and self.report_name else None,
+            'errors': [self.error_message] if self.error_message else [],
+            'eta_seconds': self.eta_seconds(),
+            'messages': [{'category': category, 'text': text} for category, text in self.messages()],
+        }
+
+    def __repr__(self):
+        return f"ImportJob({self.id}, '{self.filename}', '{self.status}')"
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
 
+# IATA port codes that should be shown with their human-readable names
+LOCATION_CODES = {
+    'KMYVA': 'Moroni',
+    'KMMUT': 'Mutsamudu'
+}
+
 def map_location_codes(location):
     """Map IATA port codes to human-readable names"""
-    location_mapping = {
-        'KMYVA': 'Moroni',
-        'KMMUT': 'Mutsamudu'
-    }
-    return location_mapping.get(location, location)
+    return LOCATION_CODES.get(location, location)
 
-from pagination import Pagination
+def map_location_codes_sql(column):
+    """SQL equivalent of map_location_codes() for use inside queries"""
+    return db.case(*[(column == code, name) for code, name in LOCATION_CODES.items()], else_=column)
+
+# ---------------------------------------------------------------------------
+# Container current-state maintenance
+# ---------------------------------------------------------------------------
+
+# Keep IN (...) lists well under SQLite's bound parameter limit
+STATE_REFRESH_CHUNK_SIZE = 500
+
+def container_state_select(container_ids=None):
+    """Build a SELECT producing container_current_state rows from the history tables.
+
+    Mirrors Container.get_current_status(), get_current_location(),
+    is_on_departed_vessel() and get_last_vessel(). ``container_ids`` may be a
+    list of ids or a select() of ids; None selects every container.
+    """
+    container = Container.__table__
+    status_table = ContainerStatus.__table__
+    movement_table = ContainerMovement.__table__
+    latest_status = status_table.alias('latest_status')
+    latest_movement = movement_table.alias('latest_movement')
+    current_vessel = Vessel.__table__.alias('current_vessel')
+
+    # Latest rows are picked by created_at, same as the model helpers (id breaks ties)
+    latest_status_id = db.select(status_table.c.id)\
+        .where(status_table.c.container_id == container.c.id)\
+        .order_by(status_table.c.created_at.desc(), status_table.c.id.desc())\
+        .limit(1).scalar_subquery()
+    latest_movement_id = db.select(movement_table.c.id)\
+        .where(movement_table.c.container_id == container.c.id)\
+        .order_by(movement_table.c.created_at.desc(), movement_table.c.id.desc())\
+        .limit(1).scalar_subquery()
+    last_discharge_vessel_id = db.select(movement_table.c.vessel_id)\
+        .where(movement_table.c.container_id == container.c.id,
+               movement_table.c.operation_type == 'discharge')\
+        .order_by(movement_table.c.created_at.desc(), movement_table.c.id.desc())\
+        .limit(1).scalar_subquery()
+
+    # A container only counts as being on a vessel when it also has a status,
+    # matching get_current_location() which returns None without one
+    on_vessel = db.and_(latest_status.c.id != None, latest_movement.c.operation_type == 'load')
+
+    query = db.select(
+        container.c.id.label('container_id'),
+        latest_status.c.id.label('status_id'),
+        latest_movement.c.id.label('movement_id'),
+        latest_status.c.status.label('status'),
+        map_location_codes_sql(latest_status.c.location).label('location'),
+        latest_status.c.date.label('status_date'),
+        db.case((on_vessel, latest_movement.c.vessel_id), else_=None).label('current_vessel_id'),
+        db.case((db.and_(on_vessel, current_vessel.c.status == 'Departed'), True), else_=False).label('on_departed_vessel'),
+        last_discharge_vessel_id.label('last_vessel_id'),
+        db.literal(datetime.utcnow(), db.DateTime).label('updated_at')
+    ).select_from(
+        container
+        .outerjoin(latest_status, latest_status.c.id == latest_status_id)
+        .outerjoin(latest_movement, latest_movement.c.id == latest_movement_id)
+        .outerjoin(current_vessel, current_vessel.c.id == latest_movement.c.vessel_id)
+    )
+
+    if container_ids is not None:
+        query = query.where(container.c.id.in_(container_ids))
+    return query
+
+def _write_container_state(connection, container_ids=None):
+    """Replace the state rows for ``container_ids`` (all rows when None)"""
+    state_table = ContainerCurrentState.__table__
+    delete_stmt = state_table.delete()
+    if container_ids is not None:
+        delete_stmt = delete_stmt.where(state_table.c.container_id.in_(container_ids))
+    connection.execute(delete_stmt)
+
+    source = container_state_select(container_ids)
+    result = connection.execute(
+        state_table.insert().from_select([column.name for column in source.selected_columns], source)
+    )
+    return result.rowcount
+
+def refresh_container_state(container_ids, connection=None):
+    """Recompute the current-state rows for the given containers.
+
+    Needed after writes that bypass the ORM (Core inserts, bulk updates), since
+    the flush listeners only see ORM objects. ``container_ids`` may be an
+    iterable of ids or a select() of ids.
+    """
+    if connection is None:
+        connection = db.session.connection()
+
+    if isinstance(container_ids, sqlalchemy.sql.Select):
+        return _write_container_state(connection, container_ids)
+
+    container_ids = sorted(set(container_ids))
+    refreshed = 0
+    for start in range(0, len(container_ids), STATE_REFRESH_CHUNK_SIZE):
+        refreshed += _write_container_state(connection, container_ids[start:start + STATE_REFRESH_CHUNK_SIZE])
+    return refreshed
+
+def rebuild_container_state():
+    """Rebuild the whole container_current_state table from history"""
+    count = _write_container_state(db.session.connection())
+    db.session.commit()
+    logger.info(f"Rebuilt container current state for {count} containers")
+    return count
+
+def ensure_container_state():
+    """Create and backfill container_current_state for databases that predate it"""
+    inspector = sqlalchemy.inspect(db.engine)
+    if not inspector.has_table(Container.__tablename__):
+        return  # Fresh database, db.create_all() will take care of it
+
+    ContainerCurrentState.__table__.create(db.engine, checkfirst=True)
+    if ContainerCurrentState.query.first() is None and Container.query.first() is not None:
+        logger.info("Container current state table is empty, rebuilding it from history")
+        rebuild_container_state()
+
+@sqlalchemy.event.listens_for(db.session, 'before_flush')
+def _remove_deleted_container_state(session, flush_context, instances):
+    """Drop state rows of containers being deleted before the container rows go"""
+    deleted_ids = [obj.id for obj in session.deleted if isinstance(obj, Container) and obj.id is not None]
+    if deleted_ids:
+        state_table = ContainerCurrentState.__table__
+        session.connection().execute(
+            state_table.delete().where(state_table.c.container_id.in_(deleted_ids))
+        )
+
+@sqlalchemy.event.listens_for(db.session, 'after_flush')
+def _sync_container_state(session, flush_context):
+    """Keep container_current_state in step with every flushed status/movement change"""
+    container_ids = set()
+    departure_changes = {}
+
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, (ContainerStatus, ContainerMovement, Container)):
+            # Cached dashboard totals go stale once this commits (see _clear_counts_on_commit)
+            session.info['container_counts_changed'] = True
+        if isinstance(obj, (ContainerStatus, ContainerMovement)):
+            if obj.container_id is not None:
+                container_ids.add(obj.container_id)
+        elif isinstance(obj, Container):
+            if obj in session.new:
+                container_ids.add(obj.id)
+        elif isinstance(obj, Vessel) and obj in session.dirty:
+            if sqlalchemy.inspect(obj).attrs.status.history.has_changes():
+                departure_changes[obj.id] = obj.status == 'Departed'
+
+    connection = session.connection()
+    if container_ids:
+        refresh_container_state(container_ids, connection)
+        _forget_prefetched_state(container_ids)
+
+    # A vessel changing status flips the departed flag of everything it carries
+    state_table = ContainerCurrentState.__table__
+    for vessel_id, departed in departure_changes.items():
+        connection.execute(
+            state_table.update()
+            .where(state_table.c.current_vessel_id == vessel_id)
+            .values(on_departed_vessel=departed)
+        )
+    if departure_changes:
+        session.info['container_counts_changed'] = True
+
+@sqlalchemy.event.listens_for(db.session, 'after_commit')
+def _clear_counts_on_commit(session):
+    """Forget cached dashboard totals once container, status or movement changes are committed.
+
+    Writes through the ORM are caught here; Core writes (imports, bulk
+    actions) call clear_count_cache() themselves. A flag left by a rolled
+    back flush only clears the cache once more than needed.
+    """
+    if session.info.pop('container_counts_changed', False):
+        clear_count_cache()
+
+def _prefetched_state(container_id):
+    """Return the batch-loaded state for a container in this request, if any"""
+    if not has_app_context():
+        return None
+    return g.get('_container_state_cache', {}).get(container_id)
+
+def _forget_prefetched_state(container_ids):
+    """Drop cached state for containers whose status or movements were just written"""
+    if not has_app_context():
+        return
+    cache = g.get('_container_state_cache')
+    if cache:
+        for container_id in container_ids:
+            cache.pop(container_id, None)
+
+def prefetch_container_state(containers):
+    """Batch-load latest status, latest movement and vessels for a list of containers.
+
+    Afterwards get_current_status(), get_current_location(), get_current_vessel(),
+    get_last_vessel() and is_on_departed_vessel() are answered from a per-request
+    cache instead of querying once per call. Costs four queries whatever the page size.
+    """
+    if not has_app_context():
+        return containers
+    if '_container_state_cache' not in g:
+        g._container_state_cache = {}
+    cache = g._container_state_cache
+    
+    container_ids = [c.id for c in containers if c.id is not None and c.id not in cache]
+    if not container_ids:
+        return containers
+    
+    # The state rows also land in the identity map, which is what is_on_departed_vessel() reads
+    states = ContainerCurrentState.query.filter(ContainerCurrentState.container_id.in_(container_ids)).all()
+    
+    status_ids = [state.status_id for state in states if state.status_id is not None]
+    statuses = {}
+    if status_ids:
+        statuses = {s.id: s for s in ContainerStatus.query.filter(ContainerStatus.id.in_(status_ids)).all()}
+    
+    movement_ids = [state.movement_id for state in states if state.movement_id is not None]
+    movements = {}
+    if movement_ids:
+        movements = {m.id: m for m in ContainerMovement.query.filter(ContainerMovement.id.in_(movement_ids)).all()}
+    
+    # Loading the vessels puts them in the identity map, so movement.vessel needs no extra query
+    vessel_ids = {m.vessel_id for m in movements.values() if m.vessel_id is not None}
+    vessel_ids.update(state.last_vessel_id for state in states if state.last_vessel_id is not None)
+    vessels = {}
+    if vessel_ids:
+        vessels = {v.id: v for v in Vessel.query.filter(Vessel.id.in_(vessel_ids)).all()}
+    
+    # Containers without a state row yet simply fall back to the per-container queries
+    for state in states:
+        cache[state.container_id] = {
+            'status': statuses.get(state.status_id),
+            'movement': movements.get(state.movement_id),
+            'last_vessel': vessels.get(state.last_vessel_id),
+        }
+    return containers
+
+from pagination import Pagination, keyset_order_by, clear_count_cache
+from scheduler import IntervalScheduler
+from bulk_write import (insert_rows, insert_returning_ids, upsert_rows, write_isolating_failures,
+                        AdaptiveBatchSize, SQLITE_MAX_VARIABLES)
+from pg_import import copy_import_supported, copy_import_batch, staged_container_ids
+from container_import import (normalize_import_frame, import_records, missing_import_columns,
+                              has_status_columns, ImportLookups, ImportFileError, ExcelSheetReader,
+                              ImportValidator, REPORT_COLUMNS, list_import_sources, iter_import_source,
+                              init_import_source_worker, stream_import_source)
+
+def insert_container_history(status_rows=(), movement_rows=(), connection=None):
+    """Bulk insert status and movement rows (plain dicts) and refresh the affected state rows.
+
+    Core inserts skip the flush listeners, so the current-state rows of every
+    container touched are recomputed here in the same transaction.
+    """
+    if connection is None:
+        connection = db.session.connection()
+    status_rows, movement_rows = list(status_rows), list(movement_rows)
+    insert_rows(connection, ContainerStatus.__table__, status_rows)
+    insert_rows(connection, ContainerMovement.__table__, movement_rows)
+
+    container_ids = {row['container_id'] for row in status_rows + movement_rows}
+    if container_ids:
+        refresh_container_state(container_ids, connection)
+        _forget_prefetched_state(container_ids)
+    return container_ids
+
+def load_import_lookups():
+    """Load the existing containers, clients and vessels an import checks rows against.
+
+    Three queries per file instead of several per row.
+    """
+    return ImportLookups(
+        containers=db.session.execute(
+            db.select(Container.container_number, Container.bl_number)
+        ).all(),
+        clients=db.session.execute(
+            db.select(Client.id, Client.name).order_by(Client.id)
+        ).all(),
+        vessels=db.session.execute(
+            db.select(Vessel.id, Vessel.name, Vessel.imo_number).order_by(Vessel.id)
+        ).all(),
+    )
 
 # Add this before your first route definition, after Flask app is created
 @app.template_filter('nl2br')
@@ -391,12 +994,138 @@ def nl2br_filter(s):
         return ''
     return s.replace('\n', '<br>')
 
+# Statuses that have their own filter button on the dashboard; anything else is 'other'
+STANDARD_STATUSES = ['loaded', 'discharged', 'emptied', 'full', 'full_deliveried']
+
+# Statuses an import sheet may use; dry runs warn about anything else
+IMPORT_STATUSES = STANDARD_STATUSES + ['in_transit', 'customs_hold', 'ready_for_pickup']
+
+def container_status_summary():
+    """Count containers by current status and location in a single grouped query.
+
+    Returns a dict with:
+      total              - all containers
+      by_status          - {status: count} over all containers (dashboard tiles, reports)
+      active_by_status   - {status: count} excluding containers on departed vessels
+      by_location        - {location: count} excluding containers on departed vessels
+      by_status_location - {(status, location): count} excluding departed-vessel containers
+    """
+    rows = db.session.query(
+        ContainerCurrentState.status,
+        ContainerCurrentState.location,
+        ContainerCurrentState.on_departed_vessel,
+        db.func.count(ContainerCurrentState.container_id)
+    ).group_by(
+        ContainerCurrentState.status,
+        ContainerCurrentState.location,
+        ContainerCurrentState.on_departed_vessel
+    ).all()
+
+    summary = {
+        'total': 0,
+        'by_status': {},
+        'active_by_status': {},
+        'by_location': {},
+        'by_status_location': {},
+    }
+    for status, location, on_departed_vessel, count in rows:
+        summary['total'] += count
+        if status is not None:
+            summary['by_status'][status] = summary['by_status'].get(status, 0) + count
+        if on_departed_vessel:
+            continue
+        if status is not None:
+            summary['active_by_status'][status] = summary['active_by_status'].get(status, 0) + count
+        if location is not None:
+            summary['by_location'][location] = summary['by_location'].get(location, 0) + count
+        key = (status, location)
+        summary['by_status_location'][key] = summary['by_status_location'].get(key, 0) + count
+    return summary
+
+def filtered_containers_query(location_filter='', status_filter='', full_type='all', search_term=''):
+    """Build the dashboard container query with every filter applied in SQL.
+
+    Joins each container to its container_current_state row and excludes
+    containers on departed vessels, then applies the location, status
+    (including the full/full_deliveried/other sub-filters) and search filters.
+    """
+    query = Container.query.outerjoin(
+        ContainerCurrentState, ContainerCurrentState.container_id == Container.id
+    ).filter(
+        db.func.coalesce(ContainerCurrentState.on_departed_vessel, False) == False
+    )
+    
+    if search_term:
+        # Search by container number, type, BL number, vessel name, etc.
+        query = query.filter(
+            db.or_(
+                Container.container_number.ilike(f'%{search_term}%'),
+                Container.container_type.ilike(f'%{search_term}%'),
+                Container.bl_number.ilike(f'%{search_term}%'),
+                Container.opr.ilike(f'%{search_term}%')
+            )
+        )
+    
+    # The state table already stores mapped location names
+    if location_filter:
+        query = query.filter(ContainerCurrentState.location == location_filter)
+    
+    if status_filter:
+        if status_filter == 'other':
+            # Containers with a status OTHER THAN loaded, discharged, emptied, or full
+            query = query.filter(
+                ContainerCurrentState.status != None,
+                ContainerCurrentState.status.notin_(STANDARD_STATUSES)
+            )
+        elif status_filter == 'full':
+            # Special case for full status - include 'full_deliveried' as well
+            if full_type == 'all':
+                query = query.filter(ContainerCurrentState.status.in_(['full', 'full_deliveried']))
+            elif full_type == 'full_only':
+                query = query.filter(ContainerCurrentState.status == 'full')
+            elif full_type == 'full_deliveried':
+                query = query.filter(ContainerCurrentState.status == 'full_deliveried')
+            else:
+                query = query.filter(db.false())
+        else:
+            query = query.filter(ContainerCurrentState.status == status_filter)
+    
+    return query
+
+# Stand-in for NULL dates in sort keys; keyset cursors can't compare against NULL
+SORT_NULL_DATE = datetime(1900, 1, 1)
+
+def container_sort_keys(sort_by, sort_order):
+    """Dashboard sort options as (expression, descending) keys, ending with the container id.
+
+    The keys never evaluate to NULL so they can drive keyset pagination as well
+    as a plain ORDER BY; ties are broken by container id like the old stable sort.
+    """
+    descending = sort_order == 'desc'
+    if sort_by == 'status':
+        keys = [(db.func.coalesce(ContainerCurrentState.status, ''), descending),
+                (Container.container_number, descending)]
+    elif sort_by == 'container_number':
+        keys = [(Container.container_number, descending)]
+    elif sort_by == 'container_type':
+        keys = [(Container.container_type, descending)]
+    elif sort_by == 'arrival_date':
+        arrival_date = db.func.coalesce(Container.arrival_date, SORT_NULL_DATE)
+        if descending:
+            # For descending order, put NULL values last (oldest)
+            keys = [(db.case((Container.arrival_date == None, 2), else_=1), False), (arrival_date, True)]
+        else:
+            # For ascending order, put NULL values first (oldest)
+            keys = [(db.case((Container.arrival_date == None, 0), else_=1), False), (arrival_date, False)]
+    else:  # Default to created_at
+        keys = [(db.func.coalesce(Container.created_at, SORT_NULL_DATE), descending)]
+    
+    keys.append((Container.id, False))
+    return keys
+
 @app.route('/')
 @login_required
 def index():
-    # Automatically update vessel statuses when visiting homepage
-    update_vessel_statuses_auto()
-    
     # Get location filter from query parameters, default to 'Moroni'
     location_filter = request.args.get('location', 'Moroni')
     # Map location filter if it's a code
@@ -404,6 +1133,7 @@ def index():
     
     # Get status filter from query parameters
     status_filter = request.args.get('status', '')
+    full_type = request.args.get('full_type', 'all')
     
     # Get sorting parameters from the request
     sort_by = request.args.get('sort', 'arrival_date')  # Changed default to arrival_date
@@ -416,161 +1146,16 @@ def index():
     page = request.args.get('page', 1, type=int)
     per_page = 25  # Show 25 containers per page
     
-    # Start with a base query for all containers
-    # If search term provided, filter containers by container number (case insensitive)
-    if search_term:
-        # Search by container number, type, BL number, vessel name, etc.
-        all_containers_query = Container.query.filter(
-            db.or_(
-                Container.container_number.ilike(f'%{search_term}%'),
-                Container.container_type.ilike(f'%{search_term}%'),
-                Container.bl_number.ilike(f'%{search_term}%'),
-                Container.opr.ilike(f'%{search_term}%')
-            )
-        )
-    else:
-        # Special case for sorting by status since it's in a related table
-        if sort_by == 'status':
-            # We need to create a subquery to get the latest status for each container
-            latest_status_subquery = db.session.query(
-                ContainerStatus.container_id,
-                db.func.max(ContainerStatus.created_at).label('max_date')
-            ).group_by(ContainerStatus.container_id).subquery('latest_status')
-            
-            # Join with the main container table and the latest status
-            query = db.session.query(Container, ContainerStatus.status)\
-                .outerjoin(latest_status_subquery, Container.id == latest_status_subquery.c.container_id)\
-                .outerjoin(ContainerStatus, db.and_(
-                    ContainerStatus.container_id == latest_status_subquery.c.container_id,
-                    ContainerStatus.created_at == latest_status_subquery.c.max_date
-                ))
-                
-            # Apply sorting
-            if sort_order == 'asc':
-                query = query.order_by(db.asc(ContainerStatus.status), db.asc(Container.container_number))
-            else:
-                query = query.order_by(db.desc(ContainerStatus.status), db.desc(Container.container_number))
-                
-            # Execute the query and extract containers
-            all_containers_query = [container for container, _ in query.all()]
-        else:
-            # For other sort fields, use the standard approach
-            if sort_by == 'container_number':
-                if sort_order == 'desc':
-                    all_containers_query = Container.query.order_by(Container.container_number.desc())
-                else:
-                    all_containers_query = Container.query.order_by(Container.container_number)
-            elif sort_by == 'container_type':
-                if sort_order == 'desc':
-                    all_containers_query = Container.query.order_by(Container.container_type.desc())
-                else:
-                    all_containers_query = Container.query.order_by(Container.container_type)
-            elif sort_by == 'arrival_date':
-                # Sort by arrival_date with special handling for NULL values
-                if sort_order == 'desc':
-                    # For descending order, put NULL values last (oldest)
-                    # Updated syntax: pass tuples directly as positional arguments, not in a list
-                    all_containers_query = Container.query.order_by(
-                        db.case((Container.arrival_date == None, 2), else_=1),
-                        Container.arrival_date.desc()
-                    )
-                else:
-                    # For ascending order, put NULL values first (oldest)
-                    # Updated syntax: pass tuples directly as positional arguments, not in a list
-                    all_containers_query = Container.query.order_by(
-                        db.case((Container.arrival_date == None, 0), else_=1),
-                        Container.arrival_date
-                    )
-            else:  # Default to created_at
-                if sort_order == 'desc':
-                    all_containers_query = Container.query.order_by(Container.created_at.desc())
-                else:
-                    all_containers_query = Container.query.order_by(Container.created_at)
-                
-            # If we didn't special case for status, we need to execute the query
-            all_containers_query = all_containers_query.all()
-    
-    # Further processing of containers (filtering by location, etc.)
-    # Get containers that aren't on departed vessels
-    all_containers = []
-    for container in all_containers_query:
-        # Skip containers that are on departed vessels
-        if not container.is_on_departed_vessel():
-            all_containers.append(container)
-    
-    # Get all unique locations from container statuses and map them
-    locations = set()
-    statuses = set()  # Collect all available statuses for the UI
-    for container in all_containers:
-        status = container.get_current_status()
-        if status:
-            # Handle location mapping
-            if status.location:
-                # Map location codes to readable names
-                mapped_location = map_location_codes(status.location)
-                locations.add(mapped_location)
-                # Update the location in the status
-                if status.location != mapped_location:
-                    status.location = mapped_location
-            
-            # Add status to the set of available statuses
-            if status.status:
-                statuses.add(status.status)
+    # Filtering, sorting and paging all happen in SQL; previous/next use keyset
+    # cursors and the filtered total is cached briefly
+    containers_query = filtered_containers_query(location_filter, status_filter, full_type, search_term)
     
-    # Filter containers if a location is specified
-    if location_filter:
-        filtered_containers = []
-        for container in all_containers:
-            current_status = container.get_current_status()
-            if current_status:
-                # Map the status location
-                current_location = map_location_codes(current_status.location)
-                if current_location == location_filter:
-                    filtered_containers.append(container)
-        containers = filtered_containers
-    else:
-        containers = all_containers
-    
-    # Filter containers by status if specified
-    if status_filter:
-        if status_filter == 'other':
-            # Filter containers with status OTHER THAN loaded, discharged, emptied, or full
-            status_filtered = []
-            for container in containers:
-                current_status = container.get_current_status()
-                if current_status and current_status.status not in ['loaded', 'discharged', 'emptied', 'full', 'full_deliveried']:
-                    status_filtered.append(container)
-            containers = status_filtered
-        elif status_filter == 'full':
-            # Special case for full status - include 'full_deliveried' as well
-            status_filtered = []
-            
-            # Get the full type sub-filter
-            full_type = request.args.get('full_type', 'all')
-            
-            for container in containers:
-                current_status = container.get_current_status()
-                if current_status:
-                    if full_type == 'all' and current_status.status in ['full', 'full_deliveried']:
-                        status_filtered.append(container)
-                    elif full_type == 'full_only' and current_status.status == 'full':
-                        status_filtered.append(container)
-                    elif full_type == 'full_deliveried' and current_status.status == 'full_deliveried':
-                        status_filtered.append(container)
-            containers = status_filtered
-        else:
-            status_filtered = []
-            for container in containers:
-                current_status = container.get_current_status()
-                if current_status and current_status.status == status_filter:
-                    status_filtered.append(container)
-            containers = status_filtered
-    
-    # Apply pagination to the filtered containers list
-    pagination = Pagination(containers, page, per_page, 'index', 
+    pagination = Pagination(containers_query, page, per_page, 'index',
+                           keyset=container_sort_keys(sort_by, sort_order),
+                           count='cached',
                            location=location_filter,
                            status=status_filter,  # Pass status filter to pagination for URL preservation
-                           full_type=request.args.get('full_type', 'all'),  # Add full_type to pagination
+                           full_type=full_type,  # Add full_type to pagination
                            sort=sort_by, 
                            order=sort_order,
                            search=search_term)
@@ -580,24 +1165,24 @@ def index():
     vessels = Vessel.query.all()
     now = datetime.now()
     
-    # Count containers by location (excluding those on departed vessels)
-    location_counts = {}
-    for location in sorted(locations):
-        count = sum(1 for c in all_containers if c.get_current_status() and 
-                   map_location_codes(c.get_current_status().location) == location)
-        location_counts[location] = count
-    
-    # Calculate loaded and discharged counts for the selected location or overall
-    loaded_count = 0
-    discharged_count = 0
-    # These counts should be based on the filtered containers (by location)
-    for container in containers:
-        latest_status = container.get_current_status()
-        if latest_status:
-            if latest_status.status == 'loaded':
-                loaded_count += 1
-            elif latest_status.status == 'discharged':
-                discharged_count += 1
+    # Tiles, sidebar location counts and the status list all come from one grouped query
+    summary = container_status_summary()
+    location_counts = summary['by_location']
+    locations = set(location_counts)
+    
+    # Collect all available statuses for the UI
+    statuses = set(summary['active_by_status'])
+    
+    # Calculate loaded and discharged counts for the containers on this page
+    page_status_counts = {}
+    if containers:
+        page_status_counts = dict(
+            db.session.query(ContainerCurrentState.status, db.func.count())
+            .filter(ContainerCurrentState.container_id.in_([c.id for c in containers]))
+            .group_by(ContainerCurrentState.status).all()
+        )
+    loaded_count = page_status_counts.get('loaded', 0)
+    discharged_count = page_status_counts.get('discharged', 0)
     
     # Define standard locations
     standard_locations = ['Moroni', 'Mutsamudu']
@@ -605,60 +1190,21 @@ def index():
     # Get other locations (any location not in standard_locations)
     other_locations = [loc for loc in sorted(locations) if loc not in standard_locations]
     
+    # Batch-load status, movement and vessel data for the page so the template's
+    # per-row helper calls don't each hit the database
+    prefetch_container_state(containers)
+    
     # For each container, pre-fetch its vessel to ensure it's available in templates
     for container in containers:
         # Use the get_current_vessel helper to ensure vessel information is populated
         container.current_vessel = container.get_current_vessel()
     
-    # Calculate total statistics for the entire database
-    # Get total containers count
-    total_container_count = Container.query.count()
-    
-    # Get total loaded containers count using subquery to find latest status
-    latest_status_subquery = db.session.query(
-        ContainerStatus.container_id,
-        db.func.max(ContainerStatus.created_at).label('max_date')
-    ).group_by(ContainerStatus.container_id).subquery()
-    
-    # Query for loaded containers count
-    total_loaded_count = db.session.query(Container)\
-        .join(latest_status_subquery, Container.id == latest_status_subquery.c.container_id)\
-        .join(ContainerStatus, db.and_(
-            ContainerStatus.container_id == latest_status_subquery.c.container_id,
-            ContainerStatus.created_at == latest_status_subquery.c.max_date,
-            ContainerStatus.status == 'loaded'
-        ))\
-        .count()
-        
-    # Query for discharged containers count
-    total_discharged_count = db.session.query(Container)\
-        .join(latest_status_subquery, Container.id == latest_status_subquery.c.container_id)\
-        .join(ContainerStatus, db.and_(
-            ContainerStatus.container_id == latest_status_subquery.c.container_id,
-            ContainerStatus.created_at == latest_status_subquery.c.max_date,
-            ContainerStatus.status == 'discharged'
-        ))\
-        .count()
-    
-    # Query for emptied containers count
-    total_emptied_count = db.session.query(Container)\
-        .join(latest_status_subquery, Container.id == latest_status_subquery.c.container_id)\
-        .join(ContainerStatus, db.and_(
-            ContainerStatus.container_id == latest_status_subquery.c.container_id,
-            ContainerStatus.created_at == latest_status_subquery.c.max_date,
-            ContainerStatus.status == 'emptied'
-        ))\
-        .count()
-        
-    # Query for full containers count
-    total_full_count = db.session.query(Container)\
-        .join(latest_status_subquery, Container.id == latest_status_subquery.c.container_id)\
-        .join(ContainerStatus, db.and_(
-            ContainerStatus.container_id == latest_status_subquery.c.container_id,
-            ContainerStatus.created_at == latest_status_subquery.c.max_date,
-            ContainerStatus.status == 'full'
-        ))\
-        .count()
+    # Total statistics for the entire database (including containers on departed vessels)
+    total_container_count = summary['total']
+    total_loaded_count = summary['by_status'].get('loaded', 0)
+    total_discharged_count = summary['by_status'].get('discharged', 0)
+    total_emptied_count = summary['by_status'].get('emptied', 0)
+    total_full_count = summary['by_status'].get('full', 0)
     
     return render_template('index.html', 
                           containers=containers, 
@@ -854,6 +1400,616 @@ def search_clients(query):
     
     return jsonify(results)
 
+@contextlib.contextmanager
+def open_import_file(filepath, filename, batch_size, start_row=0, sheet_name=None, skip_rows=0):
+    """Open an import file as (total_rows, header columns, batch iterator).
+
+    ``filename`` tells the format of the file at ``filepath``.
+
+    Batches are DataFrames indexed by row position below the header; rows
+    before ``start_row`` are left out. ``sheet_name`` picks an Excel sheet
+    (default: the first) and ``skip_rows`` skips title rows above the header.
+    .xlsx sheets are streamed, so memory stays around one batch.
+    ``batch_size`` may be a callable (e.g. AdaptiveBatchSize), asked again
+    before every batch.
+    """
+    next_size = batch_size if callable(batch_size) else lambda: batch_size
+    if filename.endswith('.csv'):
+        # Count data rows up front so progress can show a total
+        with open(filepath, 'rb') as f:
+            total_rows = max(sum(1 for _ in f) - 1 - skip_rows, 0)
+        columns = pd.read_csv(filepath, nrows=0, skiprows=skip_rows).columns
+        # Read the CSV in batches, each as large as the current batch size
+        chunk_iterator = pd.read_csv(filepath, iterator=True, skiprows=skip_rows)
+
+        def batches():
+            with chunk_iterator:
+                while True:
+                    try:
+                        chunk_df = chunk_iterator.get_chunk(next_size())
+                    except StopIteration:
+                        return
+                    # Chunks keep a running index, so already imported rows are easy to drop
+                    chunk_df = chunk_df[chunk_df.index >= start_row]
+                    if len(chunk_df):
+                        yield chunk_df
+        yield total_rows, columns, batches()
+
+    elif filename.endswith('.xlsx'):
+        # Stream the sheet in read-only mode instead of loading the whole workbook
+        with ExcelSheetReader(filepath, sheet_name, skip_rows) as reader:
+            yield reader.total_rows, reader.columns, reader.chunks(next_size, start_row)
+
+    else:
+        # Old .xls workbooks can't be streamed; read the sheet and create our own batches
+        df = pd.read_excel(filepath, sheet_name=sheet_name or 0, skiprows=skip_rows)
+
+        def batches():
+            start_idx = start_row
+            while start_idx < len(df):
+                size = next_size()
+                yield df.iloc[start_idx:start_idx + size]
+                start_idx += size
+        yield len(df), df.columns, batches()
+
+# A batch handed to the import writer: rows of one file/sheet indexed by their
+# position within it, their normalized rows (None until normalized), the
+# file/sheet they came from with its header, and how many row positions the
+# files before it took up
+ImportBatch = namedtuple('ImportBatch', 'frame normalized source columns offset')
+
+def check_import_columns(columns):
+    # Improved error message for missing required columns
+    missing_columns = missing_import_columns(columns)
+    if missing_columns:
+        error_msg = f"Missing required columns: {', '.join(missing_columns)}. "
+        error_msg += "The Excel file must contain at minimum the columns: container_number, container_type."
+        raise ImportFileError(error_msg)
+
+def read_import_sources(sources, skip_rows=0):
+    """Read and normalize import sources, yielding them in upload order as they are read.
+
+    Yields (items, rows_ahead) pairs, where items are what
+    iter_import_source() yields for the source and rows_ahead() counts the
+    rows of later sources that are already read, for the progress total.
+    With several sources a process pool reads a few per worker ahead of the
+    one being written. Each hands its chunks back through a small queue, so
+    parsing overlaps the database writes while only a few chunks per source
+    are ever in memory.
+    """
+    now = datetime.utcnow()
+    chunk_size = app.config['IMPORT_BATCH_MAX_SIZE']
+    workers = min(app.config['IMPORT_PARSE_WORKERS'], len(sources))
+    if workers <= 1:
+        for source in sources:
+            yield iter_import_source(source, LOCATION_CODES, chunk_size, skip_rows, now), lambda: 0
+        return
+
+    # The workers only read files; they never touch the database. They are
+    # spawned rather than forked, since this runs on a runner thread of a
+    # process with open database connections and other threads
+    context = multiprocessing.get_context('spawn')
+    queues = [context.Queue(maxsize=2) for _ in range(min(workers * 2, len(sources)))]
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                               initializer=init_import_source_worker, initargs=(queues,))
+
+    def submit(index):
+        # Source i always uses queue i % len(queues), free again once source i - len(queues) is done
+        return pool.submit(stream_import_source, index % len(queues), sources[index], LOCATION_CODES,
+                           chunk_size, skip_rows, now)
+
+    def items(index, future):
+        source_queue = queues[index % len(queues)]
+        while True:
+            try:
+                item = source_queue.get(timeout=1)
+            except queue.Empty:
+                if future.done() and future.exception():
+                    raise future.exception()
+                continue
+            yield item
+            if item[0] == 'end':
+                return
+
+    futures = deque()
+    try:
+        futures.extend(submit(index) for index in range(len(queues)))
+        for index in range(len(sources)):
+            future = futures.popleft()
+            yield items(index, future), lambda: sum(ahead.result()['row_count'] for ahead in futures
+                                                    if ahead.done() and not ahead.exception())
+            if index + len(queues) < len(sources):
+                futures.append(submit(index + len(queues)))
+    finally:
+        # Reads still queued are dropped; running ones may be waiting on a full
+        # queue, so their chunks are thrown away until they finish
+        for future in futures:
+            future.cancel()
+        while not all(future.done() for future in futures):
+            for source_queue in queues:
+                while not source_queue.empty():
+                    source_queue.get_nowait()
+            time.sleep(0.05)
+        pool.shutdown()
+
+@contextlib.contextmanager
+def open_import_batches(filepath, filename, batch_size, stats, sheet_name=None, skip_rows=0, all_sheets=False):
+    """Open an upload as an iterator of ImportBatch, checking the header(s) and setting up ``stats``.
+
+    A single file is streamed through open_import_file(). A zip of several
+    files, or every sheet of a workbook with ``all_sheets``, is split into
+    sources (see list_import_sources()) that are read and normalized in
+    parallel by read_import_sources() and written one after the other in
+    upload order. Row positions run on across sources, so
+    ``stats['rows_parsed']`` still marks where to resume. A source that
+    can't be imported (unreadable, missing columns) is listed in
+    ``stats['skipped_sources']`` instead of failing the others.
+    ``batch_size`` is as for open_import_file().
+    """
+    filename = filename.lower()
+    start_row = stats['rows_parsed']
+    if not filename.endswith('.zip') and (filename.endswith('.csv') or not all_sheets):
+        with open_import_file(filepath, filename, batch_size, start_row,
+                              sheet_name, skip_rows) as (total_rows, columns, batches):
+            check_import_columns(columns)
+            stats['total_rows'] = total_rows
+            stats['has_status'] = has_status_columns(columns)
+            yield (ImportBatch(batch_df, None, None, columns, 0) for batch_df in batches)
+        return
+
+    sources = list_import_sources(filepath, filename, sheet_name, all_sheets)
+    stats['source_count'] = len(sources)
+    next_size = batch_size if callable(batch_size) else lambda: batch_size
+
+    def batches():
+        offset = 0
+        skipped = 0
+        for source, (items, rows_ahead) in zip(sources, read_import_sources(sources, skip_rows)):
+            source_offset = offset
+            for item in items:
+                if item[0] == 'columns':
+                    _, columns, estimate = item
+                    stats['total_rows'] = source_offset + (estimate or 0) + rows_ahead()
+                    stats['has_status'] = stats['has_status'] or has_status_columns(columns)
+                elif item[0] == 'chunk':
+                    # Rows a previous attempt already wrote are left out
+                    _, frame, normalized = item
+                    frame = frame[frame.index >= start_row - source_offset]
+                    start = 0
+                    while start < len(frame):
+                        batch_df = frame.iloc[start:start + next_size()]
+                        start += len(batch_df)
+                        yield ImportBatch(batch_df, normalized.loc[batch_df.index[0]:batch_df.index[-1]],
+                                          source.label, columns, source_offset)
+                else:
+                    result = item[1]
+
+            offset += result['row_count']
+            stats['total_rows'] = offset + rows_ahead()
+            if result['error']:
+                skipped += 1
+                logger.warning(f"Leaving out {result['label']}: {result['error']}")
+                if result['label'] not in [skipped_source['source'] for skipped_source in stats['skipped_sources']]:
+                    stats['skipped_sources'].append({'source': result['label'], 'error': result['error']})
+
+        if skipped == len(sources):
+            details = '; '.join(f"{skipped_source['source']}: {skipped_source['error']}"
+                                for skipped_source in stats['skipped_sources'])
+            raise ImportFileError(f"None of the files in the upload could be imported. {details}")
+    yield batches()
+
+def empty_import_stats():
+    """Counters for a new import, in the form ImportJob.import_stats() returns them"""
+    return {
+        'total_rows': None, 'rows_parsed': 0, 'rows_inserted': 0, 'rows_skipped': 0,
+        'rows_updated': 0, 'rows_unchanged': 0, 'rows_failed': 0, 'failed_rows': [],
+        'clients_created': 0, 'has_status': False, 'vessels_not_found': set(),
+        'source_count': 1, 'skipped_sources': [], 'error_count': 0, 'warning_count': 0,
+    }
+
+def import_containers_file(filepath, filename, stats=None, progress=None, sheet_name=None, skip_rows=0,
+                           upsert=False, all_sheets=False):
+    """Import containers from an Excel/CSV file, or a zip of them, in batches.
+
+    ``stats`` holds the running counters (see ImportJob.import_stats()); rows
+    before ``stats['rows_parsed']`` are skipped so an interrupted import can
+    resume. ``progress(stats)`` is called inside each batch's transaction just
+    before it commits, so whatever it writes through the session is committed
+    together with the rows it describes. ``sheet_name``, ``skip_rows`` and
+    ``all_sheets`` are passed on to open_import_batches(). Returns the final stats.
+
+    With ``upsert`` a row whose container number and BL number were imported
+    before updates that container instead of being skipped (see
+    upsert_import_rows()).
+
+    On PostgreSQL each batch goes through COPY and set-based SQL (pg_import),
+    in batches of IMPORT_COPY_BATCH_SIZE rows. Elsewhere, and for upserts,
+    batches are checked in Python and bulk inserted; their size starts at
+    IMPORT_BATCH_SIZE and follows the time each batch takes (see
+    AdaptiveBatchSize). Rows the database rejects are isolated with
+    savepoints and left out (counted in rows_failed) instead of failing the
+    whole import.
+    """
+    stats = stats or empty_import_stats()
+    use_copy = app.config['IMPORT_COPY_ENABLED'] and copy_import_supported(db.engine) and not upsert
+    if use_copy:
+        batch_size = app.config['IMPORT_COPY_BATCH_SIZE']
+    else:
+        batch_size = AdaptiveBatchSize(app.config['IMPORT_BATCH_SIZE'],
+                                       minimum=app.config['IMPORT_BATCH_MIN_SIZE'],
+                                       maximum=app.config['IMPORT_BATCH_MAX_SIZE'],
+                                       target_seconds=app.config['IMPORT_BATCH_TARGET_SECONDS'])
+    with open_import_batches(filepath, filename, batch_size, stats, sheet_name, skip_rows, all_sheets) as batches:
+        _import_batches(batches, stats, progress, use_copy, upsert,
+                        batch_size=None if use_copy else batch_size, first_data_row=skip_rows + 2)
+    return stats
+
+# Failed rows kept (with their error) on an import job; the rest are only counted and logged
+IMPORT_FAILED_ROWS_KEPT = 100
+
+def _import_batches(batches, stats, progress, use_copy=False, upsert=False, batch_size=None, first_data_row=2):
+    """Normalize and write each ImportBatch, updating ``stats`` as it goes.
+
+    ``batch_size`` (an AdaptiveBatchSize) is told how long each batch took.
+    ``first_data_row`` is the sheet row of the first data row, for reporting failed rows.
+    """
+    if progress:
+        progress(stats)
+        db.session.commit()
+
+    # Existing containers, clients and vessels, loaded once for the whole file
+    # (the COPY path checks against the tables in SQL instead)
+    lookups = None if use_copy else load_import_lookups()
+
+    def record_failures(failed, source):
+        for row, error in failed:
+            message = str(getattr(error, 'orig', None) or error).strip().splitlines()[0]
+            sheet_row = row['row_number'] - 1 + first_data_row
+            where = f"{source} row {sheet_row}" if source else f"Row {sheet_row}"
+            logger.warning(f"{where} ({row['container_number']}) could not be saved: {message}")
+            if len(stats['failed_rows']) < IMPORT_FAILED_ROWS_KEPT:
+                stats['failed_rows'].append({'source': source, 'row': sheet_row,
+                                             'container_number': row['container_number'], 'error': message})
+        stats['rows_failed'] += len(failed)
+
+    # Function to process a batch of records
+    def process_batch(batch):
+        nonlocal lookups
+        # Normalize the whole batch column by column before touching the database
+        # (multi-file imports arrive normalized by the parsing processes)
+        normalized = batch.normalized
+        if normalized is None:
+            normalized = normalize_import_frame(batch.frame, LOCATION_CODES)
+        failed = []
+
+        # Rows normalization dropped for a missing container number or type are
+        # skipped, and counted like the dry run counts them (empty rows aren't)
+        in_use = batch.frame.notna().any(axis=1)
+        for position in batch.frame.index[in_use & ~batch.frame.index.isin(normalized.index)]:
+            sheet_row = int(position) + first_data_row
+            where = f"{batch.source} row {sheet_row}" if batch.source else f"Row {sheet_row}"
+            logger.warning(f"{where} skipped: container number or type is missing")
+            stats['rows_skipped'] += 1
+
+        try:
+            copied = False
+            if use_copy:
+                try:
+                    with db.session.begin_nested():
+                        copy_import_rows(normalized, stats)
+                    copied = True
+                except StatementError as e:
+                    # Some row broke the set-based insert; redo this batch row by row
+                    # so only the bad rows are left out (lookups are reloaded, since
+                    # earlier COPY batches aren't in them)
+                    logger.warning(f"COPY import of the batch failed, retrying it in isolation: {e}")
+                    lookups = load_import_lookups()
+
+            if not copied:
+                # Step 1: Drop duplicates, checking against the preloaded containers
+                # (this batch's containers go into the lookups only once they are
+                # written, so a row the database rejects doesn't make later rows for
+                # the same container look like duplicates; `pending` catches
+                # duplicates inside the batch meanwhile)
+                new_rows = []
+                upserts = {}
+                pending = ImportLookups()
+                for row in import_records(normalized):
+                    container_number = row['container_number']
+                    bl_number = row['bl_number']
+
+                    if upsert and bl_number:
+                        # Upserts are keyed on number and BL; a later row for the same key wins
+                        # and keeps the replaced row's `exists`
+                        key = (container_number, bl_number)
+                        previous = upserts.pop(key, None)
+                        if previous:
+                            stats['rows_skipped'] += 1
+                            logger.info(f"Container {container_number} with BL {bl_number} appears again, using the later row")
+                        row['exists'] = previous['exists'] if previous else key in lookups.container_bls
+                        pending.add_container(container_number, bl_number)
+                        upserts[key] = row
+                        continue
+
+                    skip_reason = (lookups.duplicate_reason(container_number, bl_number)
+                                   or pending.duplicate_reason(container_number, bl_number))
+                    if skip_reason:
+                        stats['rows_skipped'] += 1
+                        logger.info(f"Skipping container {container_number}: {skip_reason}")
+                        continue
+                    if container_number in lookups.container_numbers or container_number in pending.container_numbers:
+                        logger.info(f"Adding container {container_number} with different BL number: {bl_number}")
+                    pending.add_container(container_number, bl_number)
+                    new_rows.append(row)
+
+                # Clients go in first, outside the savepoints below, so a rolled back
+                # write never leaves the lookups pointing at clients that don't exist
+                create_import_clients(db.session.connection(), new_rows + list(upserts.values()), lookups, stats)
+
+                # Write in bulk; rows the database rejects are found by bisecting
+                # the batch with savepoints and left out
+                failed += write_isolating_failures(new_rows, lambda rows: write_import_rows(rows, lookups, stats),
+                                                   db.session.begin_nested)
+                failed += write_isolating_failures(list(upserts.values()),
+                                                   lambda rows: upsert_import_rows(rows, lookups, stats),
+                                                   db.session.begin_nested)
+                failed_rows = {id(row) for row, _ in failed}
+                for row in new_rows + list(upserts.values()):
+                    if id(row) not in failed_rows:
+                        lookups.add_container(row['container_number'], row['bl_number'])
+                record_failures(failed, batch.source)
+
+            # Record progress and commit it together with the batch; dashboard totals are recounted
+            stats['rows_parsed'] = batch.offset + int(batch.frame.index[-1]) + 1
+            if progress:
+                progress(stats)
+            db.session.commit()
+            clear_count_cache()
+            return failed
+
+        except Exception as e:
+            # Roll back on error and re-raise for outer handler
+            db.session.rollback()
+            logger.error(f"Batch processing error: {str(e)}")
+            raise
+
+    for batch in batches:
+        started = time.monotonic()
+        failed = process_batch(batch)
+        if batch_size:
+            batch_size.record(len(batch.frame), time.monotonic() - started, failed=bool(failed))
+
+        # Force garbage collection on large files
+        if stats['total_rows'] and stats['total_rows'] > 1000:
+            import gc
+            gc.collect()
+
+    # Files of a multi-file upload left out after the last batch, and the final total
+    if progress:
+        progress(stats)
+        db.session.commit()
+
+def copy_import_rows(normalized, stats):
+    """PostgreSQL: import one normalized batch through COPY and set-based SQL"""
+    connection = db.session.connection()
+    result = copy_import_batch(connection, normalized, datetime.utcnow())
+
+    # Core writes skip the flush listeners, so build the new containers' state rows here
+    refresh_container_state(
+        db.select(staged_container_ids.c.container_id).where(staged_container_ids.c.accepted),
+        connection
+    )
+
+    stats['rows_inserted'] += result['rows_inserted']
+    stats['rows_skipped'] += result['rows_skipped']
+    stats['clients_created'] += result['clients_created']
+    stats['vessels_not_found'] |= result['vessels_not_found']
+
+def write_import_rows(new_rows, lookups, stats):
+    """Insert one batch of new import rows: clients, containers, statuses and load movements"""
+    connection = db.session.connection()
+
+    # Step 2: Create the clients these rows need in one insert
+    create_import_clients(connection, new_rows, lookups, stats)
+
+    # Step 3: Insert the containers in bulk, getting their IDs back in row order
+    container_ids = insert_returning_ids(connection, Container.__table__, [
+        import_container_values(row, lookups) for row in new_rows
+    ])
+
+    write_import_history(connection, container_ids, new_rows, lookups, stats)
+    stats['rows_inserted'] += len(container_ids)
+
+# Container fields an upsert import overwrites on existing containers
+UPSERT_COLUMNS = ['container_type', 'loading_port', 'final_destination', 'opr',
+                  'arrival_date', 'stripping_date', 'client_id']
+
+def upsert_import_rows(rows, lookups, stats):
+    """Upsert mode: insert or update rows that have a BL number, keyed on uix_container_number_bl.
+
+    Each row carries ``exists`` (its number and BL were already imported).
+    Existing containers get their changed fields updated in one
+    INSERT ... ON CONFLICT DO UPDATE; blank cells keep the stored value.
+    Only new containers get the row's status and load movement, so
+    re-importing a manifest never duplicates history.
+    """
+    connection = db.session.connection()
+    create_import_clients(connection, rows, lookups, stats)
+
+    table = Container.__table__
+    # New containers are stored like the normal insert path stores them; on
+    # conflict upsert_rows() treats empty text cells as blank, so they don't
+    # wipe stored values
+    values = [import_container_values(row, lookups) for row in rows]
+    changed = upsert_rows(connection, table, values, ['container_number', 'bl_number'], UPSERT_COLUMNS,
+                          index_where=table.c.bl_number.is_not(None))
+    changed_ids = {(number, bl_number): container_id for container_id, number, bl_number in changed}
+
+    new_rows = [row for row in rows if not row['exists']]
+    new_ids = [changed_ids[(row['container_number'], row['bl_number'])] for row in new_rows]
+    write_import_history(connection, new_ids, new_rows, lookups, stats)
+
+    rows_updated = len(changed_ids) - len(new_ids)
+    stats['rows_inserted'] += len(new_ids)
+    stats['rows_updated'] += rows_updated
+    stats['rows_unchanged'] += len(rows) - len(new_rows) - rows_updated
+
+def import_container_values(row, lookups):
+    """Container table values for a normalized import row"""
+    return {
+        'container_number': row['container_number'],
+        'container_type': row['container_type'],
+        'loading_port': row['loading_port'],
+        'final_destination': row['final_destination'],
+        'opr': row['opr'],
+        'bl_number': row['bl_number'],
+        'arrival_date': row['arrival_date'],
+        'stripping_date': row['stripping_date'],
+        'client_id': lookups.client_id(row['client_name']),
+    }
+
+def create_import_clients(connection, rows, lookups, stats):
+    """Create the clients that import rows name but that don't exist yet, in one insert"""
+    missing_clients = lookups.missing_clients(row['client_name'] for row in rows)
+    if missing_clients:
+        now = datetime.utcnow()
+        client_ids = insert_returning_ids(connection, Client.__table__, [
+            {'name': name, 'created_at': now} for name in missing_clients
+        ])
+        for client_id, name in zip(client_ids, missing_clients):
+            lookups.add_client(client_id, name)
+        stats['clients_created'] += len(missing_clients)
+
+def write_import_history(connection, container_ids, new_rows, lookups, stats):
+    """Insert the statuses and load movements of newly imported containers and build their state rows"""
+    # Step 4: Build status and load movement rows for containers that have them
+    status_rows = []
+    movement_rows = []
+    for container_id, row in zip(container_ids, new_rows):
+        if not row['has_status']:
+            continue
+        status = row['status']
+        status_date = row['status_date']
+        status_location = row['status_location']
+        notes = row['notes']
+
+        status_rows.append({
+            'status': status,
+            'date': status_date,
+            'location': status_location,
+            'notes': notes,
+            'container_id': container_id,
+        })
+
+        # Handle vessel information if provided - FIXED VESSEL ASSOCIATION
+        if status == 'loaded' and row['vessel_info'] is not None:
+            # Exact name and voyage match first, then name alone
+            vessel = lookups.vessel(row['vessel_name'], row['voyage_number'])
+            if not vessel:
+                # Track vessels not found for warning message
+                stats['vessels_not_found'].add(row['vessel_info'])
+                continue
+
+            vessel_id, vessel_name = vessel
+            movement_rows.append({
+                'operation_type': 'load',
+                'operation_date': status_date,
+                'location': status_location,
+                'notes': f"Automatically created from bulk import: {notes or 'No notes'}",
+                'container_id': container_id,
+                'vessel_id': vessel_id,
+            })
+            logger.info(f"Created load movement for container {row['container_number']} onto vessel {vessel_name}")
+
+    # Step 5: Insert statuses and movements in bulk, then build the state rows
+    # for every new container (Core inserts skip the flush listeners)
+    insert_rows(connection, ContainerStatus.__table__, status_rows)
+    insert_rows(connection, ContainerMovement.__table__, movement_rows)
+    refresh_container_state(container_ids, connection)
+
+def validate_containers_file(filepath, filename, report_path, progress=None, sheet_name=None, skip_rows=0,
+                             upsert=False, all_sheets=False):
+    """Dry run of import_containers_file(): check every row and write a CSV report, but import nothing.
+
+    Runs the same normalization, duplicate checks and client/vessel lookups as
+    a real import, and writes one report line per problem (see
+    container_import.REPORT_COLUMNS). Always reads the whole file, since the
+    duplicate checks depend on every earlier row. Returns the stats, where
+    rows_inserted/rows_skipped are the rows that would be imported/rejected.
+    """
+    stats = empty_import_stats()
+    with open_import_batches(filepath, filename, app.config['IMPORT_BATCH_SIZE'], stats,
+                             sheet_name, skip_rows, all_sheets) as batches, \
+            open(report_path, 'w', newline='', encoding='utf-8') as report_file:
+        # Sheet rows count from 1 and the header sits below any skipped title rows
+        validator = ImportValidator(load_import_lookups(), [], IMPORT_STATUSES,
+                                    first_data_row=skip_rows + 2, upsert=upsert)
+        report = csv.DictWriter(report_file, fieldnames=REPORT_COLUMNS)
+        report.writeheader()
+        if progress:
+            progress(stats)
+            db.session.commit()
+
+        reported_sources = 0
+
+        def report_skipped_sources():
+            # Files left out of a multi-file upload are errors in the report
+            nonlocal reported_sources
+            for skipped in stats['skipped_sources'][reported_sources:]:
+                report.writerow({'source': skipped['source'], 'severity': 'error',
+                                 'problem': f"Not imported: {skipped['error']}",
+                                 'suggestion': 'Fix the file and upload it on its own'})
+                stats['error_count'] += 1
+            reported_sources = len(stats['skipped_sources'])
+
+        source = columns = None
+        for batch in batches:
+            report_skipped_sources()
+            if batch.source != source or columns is None:
+                source, columns = batch.source, batch.columns
+                header_problems = validator.start_source(columns, source)
+                report.writerows(header_problems)
+                stats['warning_count'] += len(header_problems)
+
+            normalized = batch.normalized
+            if normalized is None:
+                normalized = normalize_import_frame(batch.frame, LOCATION_CODES)
+            report.writerows(validator.check_batch(batch.frame, normalized, stats, source))
+            stats['rows_parsed'] = batch.offset + int(batch.frame.index[-1]) + 1
+            if progress:
+                progress(stats)
+                db.session.commit()
+
+        report_skipped_sources()
+        if progress:
+            progress(stats)
+            db.session.commit()
+    return stats
+
+def bundle_import_uploads(files):
+    """Name and stream of an import upload; several files are zipped together into one.
+
+    The zip is spooled like the uploads themselves, and stored uncompressed
+    since workbooks are compressed already.
+    """
+    if len(files) == 1:
+        return secure_filename(files[0].filename), files[0].stream
+
+    bundle = tempfile.SpooledTemporaryFile(max_size=app.config['IMPORT_SPOOL_MAX_BYTES'],
+                                           mode='w+b', dir=UPLOAD_SPOOL_DIR)
+    names = set()
+    with zipfile.ZipFile(bundle, 'w', zipfile.ZIP_STORED) as archive:
+        for number, file in enumerate(files, 1):
+            name = secure_filename(file.filename) or f'file_{number}'
+            if name in names:
+                name = f'{number}_{name}'
+            names.add(name)
+            file.stream.seek(0)
+            with archive.open(name, 'w') as member:
+                shutil.copyfileobj(file.stream, member)
+    first = os.path.splitext(secure_filename(files[0].filename))[0] or 'upload'
+    return f'{first}_and_{len(files) - 1}_more.zip', bundle
+
 # Modify the add_container route to handle the client name autocomplete
 @app.route('/containers/add', methods=['GET', 'POST'])
 @login_required
@@ -861,310 +2017,50 @@ def add_container():
     if request.method == 'POST':
         # Check if it's an Excel import or a single container add
         if 'file' in request.files:
-            file = request.files['file']
-            if file.filename == '':
+            # Several files can be picked at once (e.g. one manifest per vessel)
+            files = [file for file in request.files.getlist('file') if file.filename]
+            if not files:
                 flash('No file selected', 'danger')
                 return redirect(request.url)
-            if file and allowed_file(file.filename):
-                filename = secure_filename(file.filename)
-                filepath = os.path.join(app.root_path, app.config['UPLOAD_FOLDER'], filename)
-                file.save(filepath)
-                try:
-                    # Process the Excel file
-                    if filename.endswith('.csv'):
-                        # Use chunksize for CSV files to process in batches
-                        chunk_iterator = pd.read_csv(filepath, chunksize=100)
-                        df = next(chunk_iterator)  # Get first chunk for column validation
-                    else:
-                        # For Excel files, we'll process in batches later
-                        df = pd.read_excel(filepath)
-                    
-                    # Improved error message for missing required columns
-                    missing_columns = []
-                    required_columns = ['container_number', 'container_type']
-                    for col in required_columns:
-                        if col not in df.columns:
-                            missing_columns.append(col)
-                    if missing_columns:
-                        error_msg = f"Error: Missing required columns: {', '.join(missing_columns)}. "
-                        error_msg += "The Excel file must contain at minimum the columns: container_number, container_type. "
-                        flash(error_msg, 'danger')
-                        return redirect(request.url)
-                    
-                    # Process file in batches
-                    success_count = 0
-                    error_count = 0
-                    vessels_not_found = set()
-                    clients_created = 0  # Counter for new clients created
-                    
-                    # Function to process a batch of records
-                    def process_batch(batch_df):
-                        nonlocal success_count, error_count, vessels_not_found, clients_created
-                        container_objects = []
-                        
-                        try:
-                            # Step 1: Create container objects first
-                            for _, row in batch_df.iterrows():
-                                container_number = str(row['container_number']).strip()
-                                container_type = str(row['container_type']).strip()
-                                # Skip empty rows
-                                if not container_number or not container_type:
-                                    continue
-                                
-                                # Check if BL number exists in the row
-                                bl_number = str(row.get('bl_number', '')).strip() if not pd.isna(row.get('bl_number', '')) else None
-                                
-                                # Check if container already exists
-                                existing_container = Container.query.filter_by(container_number=container_number).first()
-                                if existing_container:
-                                    # Only skip if BL number is missing or same as existing container
-                                    if not bl_number:
-                                        error_count += 1
-                                        logger.info(f"Skipping container {container_number}: already exists and no new BL number provided")
-                                        continue
-                                    
-                                    if existing_container.bl_number and bl_number == existing_container.bl_number:
-                                        error_count += 1
-                                        logger.info(f"Skipping container {container_number}: already exists with same BL number {bl_number}")
-                                        continue
-                                    
-                                    # Otherwise proceed with adding the container with a different BL
-                                    logger.info(f"Adding container {container_number} with different BL number: {bl_number}")
-                                    
-                                # Handle client association if specified - check for client column case-insensitively
-                                client_id = None
-                                client_column = next((col for col in row.index if col.lower() == 'client'), None)
-                                
-                                if client_column and not pd.isna(row[client_column]):
-                                    client_name = str(row[client_column]).strip()
-                                    if client_name:
-                                        # Try to find existing client
-                                        client = Client.query.filter(Client.name.ilike(client_name)).first()
-                                        if client:
-                                            client_id = client.id
-                                        else:
-                                            # Create new client with this name
-                                            new_client = Client(
-                                                name=client_name,
-                                                created_at=datetime.utcnow()
-                                            )
-                                            db.session.add(new_client)
-                                            db.session.flush()
-                                            client_id = new_client.id
-                                            clients_created += 1
-                                
-                                new_container = Container(
-                                    container_number=container_number,
-                                    container_type=container_type,
-                                    loading_port=map_location_codes(str(row.get('loading_port', '')).strip()) if not pd.isna(row.get('loading_port', '')) else None,
-                                    final_destination=map_location_codes(str(row.get('final_destination', '')).strip()) if not pd.isna(row.get('final_destination', '')) else None,
-                                    opr=str(row.get('opr', '')).strip() if not pd.isna(row.get('opr', '')) else None,
-                                    bl_number=bl_number,
-                                    client_id=client_id  # Associate with client ID
-                                )
-                                
-                                # Parse dates if provided
-                                # Process arrival date
-                                if 'arrival_date' in row and not pd.isna(row['arrival_date']):
-                                    try:
-                                        # Handle different date formats from Excel
-                                        if isinstance(row['arrival_date'], datetime):
-                                            new_container.arrival_date = row['arrival_date']
-                                        elif isinstance(row['arrival_date'], str):
-                                            # Try multiple date formats
-                                            date_formats = ['%Y-%m-%d', '%d/%m/%Y', '%m/%d/%Y']
-                                            for fmt in date_formats:
-                                                try:
-                                                    new_container.arrival_date = datetime.strptime(row['arrival_date'], fmt)
-                                                    break
-                                                except ValueError:
-                                                    continue
-                                        elif isinstance(row['arrival_date'], (int, float)):
-                                            # Handle Excel numeric date format
-                                            new_container.arrival_date = datetime(1899, 12, 30) + timedelta(days=int(row['arrival_date']))
-                                    except Exception as e:
-                                        logger.warning(f"Error parsing arrival date for {container_number}: {str(e)}")
-                                        
-                                # Process stripping date
-                                if 'stripping_date' in row and not pd.isna(row['stripping_date']):
-                                    try:
-                                        # Handle different date formats from Excel
-                                        if isinstance(row['stripping_date'], datetime):
-                                            new_container.stripping_date = row['stripping_date']
-                                        elif isinstance(row['stripping_date'], str):
-                                            # Try multiple date formats
-                                            date_formats = ['%Y-%m-%d', '%d/%m/%Y', '%m/%d/%Y']
-                                            for fmt in date_formats:
-                                                try:
-                                                    new_container.stripping_date = datetime.strptime(row['stripping_date'], fmt)
-                                                    break
-                                                except ValueError:
-                                                    continue
-                                        elif isinstance(row['stripping_date'], (int, float)):
-                                            # Handle Excel numeric date format
-                                            new_container.stripping_date = datetime(1899, 12, 30) + timedelta(days=int(row['stripping_date']))
-                                    except Exception as e:
-                                        logger.warning(f"Error parsing stripping date for {container_number}: {str(e)}")
-                                
-                                db.session.add(new_container)
-                                container_objects.append({
-                                    'container': new_container,
-                                    'row_data': row
-                                })
-                            
-                            # Step 2: Flush to get IDs assigned
-                            if container_objects:
-                                db.session.flush()
-                                
-                                # Step 3: Process container relationships with the row data we stored
-                                for obj in container_objects:
-                                    container = obj['container']
-                                    row = obj['row_data']
-                                    
-                                    # Add status if provided
-                                    has_status = all(col in batch_df.columns for col in ['status', 'date', 'location'])
-                                    
-                                    if has_status and not pd.isna(row.get('status')) and not pd.isna(row.get('date')) and not pd.isna(row.get('location')):
-                                        status = str(row['status']).strip().lower()
-                                        
-                                        # Parse the date
-                                        try:
-                                            if isinstance(row['date'], pd.Timestamp):
-                                                status_date = row['date'].to_pydatetime()
-                                            else:
-                                                status_date = datetime.strptime(str(row['date']), '%Y-%m-%d')
-                                        except Exception as e:
-                                            logger.error(f"Error parsing date {row['date']}: {str(e)}")
-                                            status_date = datetime.utcnow()
-                                        
-                                        status_location = map_location_codes(str(row['location']).strip())
-                                        # Add notes if available
-                                        notes = str(row.get('notes', '')).strip() if not pd.isna(row.get('notes', '')) else None
-                                        
-                                        container_status = ContainerStatus(
-                                            status=status,
-                                            date=status_date,
-                                            location=status_location,
-                                            notes=notes,
-                                            container_id=container.id   
-                                        )
-                                        db.session.add(container_status)
-                                        
-                                        # Handle vessel information if provided - FIXED VESSEL ASSOCIATION
-                                        if status.lower() == 'loaded':
-                                            vessel_name = None
-                                            voyage_number = None
-                                            
-                                            # Check if vessel column exists and has a value
-                                            if 'vessel' in batch_df.columns and not pd.isna(row.get('vessel')):
-                                                vessel_info = str(row['vessel']).strip()
-                                                
-                                                # Try to extract vessel name and voyage number
-                                                # Common format: "VESSEL NAME V1234" where V1234 is the voyage number
-                                                if ' V' in vessel_info:
-                                                    # Split by " V" and take the voyage part
-                                                    parts = vessel_info.split(' V', 1)
-                                                    if len(parts) == 2:
-                                                        vessel_name = parts[0].strip()
-                                                        voyage_number = 'V' + parts[1].strip()
-                                                else:
-                                                    # No voyage number format, use the whole value as vessel name
-                                                    vessel_name = vessel_info
-                                                
-                                                # Try to find the vessel in database
-                                                vessel = None
-                                                if vessel_name and voyage_number:
-                                                    # Look for exact match on name and IMO/voyage
-                                                    vessel = Vessel.query.filter(
-                                                        Vessel.name.ilike(vessel_name),
-                                                        Vessel.imo_number.ilike(voyage_number)
-                                                    ).first()
-                                                
-                                                if vessel_name and not vessel:
-                                                    # Try just by name as fallback
-                                                    vessel = Vessel.query.filter(
-                                                        Vessel.name.ilike(vessel_name)
-                                                    ).first()
-                                                    
-                                                    if not vessel:
-                                                        # Track vessels not found for warning message
-                                                        vessels_not_found.add(vessel_info)
-                                                    
-                                                # Create container movement if vessel is found
-                                                if vessel:
-                                                    movement = ContainerMovement(
-                                                        operation_type='load',
-                                                        operation_date=status_date,
-                                                        location=status_location,
-                                                        notes=f"Automatically created from bulk import: {notes or 'No notes'}",
-                                                        container_id=container.id,
-                                                        vessel_id=vessel.id
-                                                    )
-                                                    db.session.add(movement)
-                                                    logger.info(f"Created load movement for container {container.container_number} onto vessel {vessel.name}")
-                                    
-                                    # Step 4: Count successfully added containers and commit
-                                    success_count += len(container_objects)
-                                    db.session.commit()
-                                
-                                # Step 5: Clear SQLAlchemy session to free memory
-                                db.session.expunge_all()
-                                
-                        except Exception as e:
-                            # Roll back on error and re-raise for outer handler
-                            db.session.rollback()
-                            logger.error(f"Batch processing error: {str(e)}")
-                            raise
-                    
-                    # Process in batches based on file type
-                    if filename.endswith('.csv'):
-                        # For CSV we already have the chunk iterator
-                        process_batch(df)  # Process first chunk we already loaded
-                        
-                        # Process remaining chunks
-                        for chunk_df in chunk_iterator:
-                            process_batch(chunk_df)
-                    else:
-                        # For Excel, create our own batches
-                        total_rows = len(df)
-                        batch_size = 100
-                        
-                        for start_idx in range(0, total_rows, batch_size):
-                            end_idx = min(start_idx + batch_size, total_rows)
-                            batch_df = df.iloc[start_idx:end_idx]
-                            process_batch(batch_df)
-                            
-                            # Clear memory
-                            del batch_df
-                            
-                            # Force garbage collection on large files
-                            if total_rows > 1000:
-                                import gc
-                                gc.collect()
-                                
-                    # Determine if status info was imported
-                    has_status = all(col in df.columns for col in ['status', 'date', 'location'])
-                    status_msg = " Status information was also imported." if has_status else ""
-                    client_msg = f" {clients_created} new clients were created." if clients_created > 0 else ""
-                    flash(f'Successfully imported {success_count} containers.{status_msg}{client_msg} {error_count} containers were duplicates and skipped.', 'success')
-                    
-                    if vessels_not_found:
-                        flash(f'Warning: Some vessels were not found in the system: {", ".join(vessels_not_found)}. Please add these vessels first.', 'warning')
-                        
-                except Exception as e:
-                    db.session.rollback()
-                    flash(f'Error processing file: {str(e)}', 'danger')
-                    logger.error(f"File upload error: {str(e)}", exc_info=True)
+            if all(allowed_file(file.filename) for file in files):
+                if len(files) > 1 and any(file.filename.lower().endswith('.zip') for file in files):
+                    flash('Upload a zip file on its own, or pick the files without zipping them.', 'danger')
+                    return redirect(request.url)
+                filename, upload = bundle_import_uploads(files)
                 
-                # Delete the file after processing
+                # Optional sheet name and number of title rows above the header
+                sheet_name = request.form.get('sheet_name', '').strip() or None
                 try:
-                    os.remove(filepath)
-                except Exception as e:
-                    logger.error(f"Error removing temporary file: {str(e)}")
+                    skip_rows = max(int(request.form.get('skip_rows') or 0), 0)
+                except ValueError:
+                    skip_rows = 0
+                # Every sheet of each workbook instead of just one
+                all_sheets = bool(request.form.get('all_sheets'))
+                
+                # Validate only: report problems per row without importing anything
+                dry_run = bool(request.form.get('dry_run'))
+                # Upsert: update containers already imported with the same number and BL
+                mode = 'upsert' if request.form.get('mode') == 'upsert' else 'insert'
                 
-                return redirect(url_for('index'))
+                job = ImportJob(filename=filename, sheet_name=sheet_name, skip_rows=skip_rows,
+                                all_sheets=all_sheets, dry_run=dry_run, mode=mode,
+                                created_by=current_user.id if current_user.is_authenticated else None)
+                
+                # Save the upload from its in-memory buffer under a unique name and queue it
+                # for the import runner, so the request never parses or writes the rows itself
+                upload.seek(0)
+                job.stored_name = f"{uuid.uuid4().hex}_{filename}"
+                with open(job.file_path(), 'wb') as saved:
+                    shutil.copyfileobj(upload, saved)
+                db.session.add(job)
+                db.session.commit()
+                if dry_run:
+                    flash(f'{filename} was uploaded and will be checked in the background. Nothing will be imported.', 'info')
+                else:
+                    flash(f'{filename} was uploaded and will be imported in the background.', 'info')
+                return redirect(url_for('import_job_detail', id=job.id))
             else:
-                flash('File type not allowed. Please upload xlsx, xls or csv files.', 'danger')
+                flash('File type not allowed. Please upload xlsx, xls, csv or zip files.', 'danger')
                 return redirect(request.url)
         else:
             # Enhanced single container add with status information
@@ -1289,7 +2185,37 @@ def add_container():
     vessels = Vessel.query.all()
     # Get clients for the client dropdown
     clients = Client.query.order_by(Client.name).all()
-    return render_template('add_container.html', now=datetime.now(), vessels=vessels, clients=clients)
+    # Recent imports by this user, so a running one is easy to get back to
+    import_jobs = ImportJob.query.filter_by(created_by=current_user.id)\
+        .order_by(ImportJob.id.desc()).limit(5).all()
+    return render_template('add_container.html', now=datetime.now(), vessels=vessels, clients=clients,
+                           import_jobs=import_jobs)
+
+@app.route('/containers/import/<int:id>')
+@login_required
+def import_job_detail(id):
+    """Progress page for a background container import"""
+    job = ImportJob.query.get_or_404(id)
+    return render_template('import_job.html', job=job)
+
+@app.route('/api/import-jobs/<int:id>')
+@login_required  # Protect API endpoints
+def import_job_status(id):
+    """Progress of a background container import, polled by the import page"""
+    job = ImportJob.query.get_or_404(id)
+    return jsonify(job.to_dict())
+
+@app.route('/containers/import/<int:id>/report')
+@login_required
+def import_job_report(id):
+    """Download the per-row problem report of a dry-run import"""
+    job = ImportJob.query.get_or_404(id)
+    report_path = job.report_path()
+    if job.status != 'completed' or not report_path or not os.path.exists(report_path):
+        flash('No validation report is available for this import.', 'warning')
+        return redirect(url_for('import_job_detail', id=id))
+    download_name = f"{os.path.splitext(job.filename)[0]}_validation_report.csv"
+    return send_file(report_path, mimetype='text/csv', as_attachment=True, download_name=download_name)
 
 @app.route('/containers/<int:id>/update_status', methods=['GET', 'POST'])
 @login_required
@@ -1801,9 +2727,6 @@ def create_import_template(output_path=None):
 @login_required  # Add login_required to vessels list view
 def vessels():
     """List all vessels"""
-    # Check and update vessel statuses automatically based on ETA
-    update_vessel_statuses_auto()
-    
     # Get page parameter with default value of 1
     page = request.args.get('page', 1, type=int)
     per_page = 10  # Show 10 vessels per page
@@ -1830,30 +2753,23 @@ def vessels():
             )
         )
     
-    # Apply sorting
+    # Sort keys (never NULL, ending with the id) so the list can use keyset pagination
+    descending = sort_order == 'desc'
     if sort_by == 'name':
-        if sort_order == 'desc':
-            vessels_query = vessels_query.order_by(Vessel.name.desc())
-        else:
-            vessels_query = vessels_query.order_by(Vessel.name)
+        sort_keys = [(Vessel.name, descending)]
     elif sort_by == 'status':
-        if sort_order == 'desc':
-            vessels_query = vessels_query.order_by(Vessel.status.desc())
-        else:
-            vessels_query = vessels_query.order_by(Vessel.status)
+        sort_keys = [(db.func.coalesce(Vessel.status, ''), descending)]
     else:  # Default to created_at
-        if sort_order == 'desc':
-            vessels_query = vessels_query.order_by(Vessel.created_at.desc())
-        else:
-            vessels_query = vessels_query.order_by(Vessel.created_at)
-    
-    # Get total vessels for statistics
-    total_vessel_count = vessels_query.count()
+        sort_keys = [(db.func.coalesce(Vessel.created_at, SORT_NULL_DATE), descending)]
+    sort_keys.append((Vessel.id, descending))
     
     # Create pagination object
-    pagination = Pagination(vessels_query, page, per_page, 'vessels', 
+    pagination = Pagination(vessels_query, page, per_page, 'vessels', keyset=sort_keys,
                            sort=sort_by, order=sort_order, search=search_term)
     
+    # Get total vessels for statistics
+    total_vessel_count = pagination.total
+    
     # Get paginated vessels
     vessel_list = pagination.items
     
@@ -1906,8 +2822,6 @@ def add_vessel():
 @login_required  # Add login_required to vessel detail view
 def vessel_detail(id):
     """Show vessel details"""
-    # Check and update vessel status automatically based on ETA
-    update_vessel_statuses_auto(vessel_id=id)
     vessel = Vessel.query.get_or_404(id)
     loaded_containers = vessel.get_loaded_containers()
     # Get container movement history for this vessel
@@ -1950,12 +2864,8 @@ def update_vessel(id):
                 vessel.current_destination = ""
             
             # Update arrival date for all containers on this vessel
-            loaded_containers = vessel.get_loaded_containers()
-            container_count = 0
-            for container in loaded_containers:
-                # Always use the current vessel ETA value (which may have just been updated)
-                container.arrival_date = vessel.eta or datetime.now()
-                container_count += 1
+            # Always use the current vessel ETA value (which may have just been updated)
+            container_count = vessel.propagate_arrival_date(vessel.eta or datetime.now())
             
             if container_count > 0:
                 flash(f'Updated arrival date for {container_count} containers to match vessel arrival date ({vessel.eta or datetime.now()}).', 'info')
@@ -2171,6 +3081,18 @@ def delete_vessel(id):
         
         # Then delete the vessel
         db.session.delete(vessel)
+        db.session.flush()
+
+        # Rebuild any container state still pointing at the vessel as its current or
+        # last discharge vessel; the flush listener only refreshes the containers of
+        # the movements deleted above
+        state_table = ContainerCurrentState.__table__
+        stale_ids = db.session.scalars(db.select(state_table.c.container_id).where(db.or_(
+            state_table.c.current_vessel_id == id,
+            state_table.c.last_vessel_id == id
+        ))).all()
+        if stale_ids:
+            refresh_container_state(stale_ids)
         db.session.commit()
         flash(f'Vessel {vessel_name} deleted successfully!', 'success')
     except Exception as e:
@@ -2179,81 +3101,187 @@ def delete_vessel(id):
         logger.error(f"Vessel delete error: {str(e)}")
     return redirect(url_for('vessels'))
 
+# Ids per IN list in the bulk container endpoints, so selections of tens of
+# thousands of containers stay under the database's bound parameter limit. Each
+# id is a parameter, and SQLite builds before 3.32 allow only 999 per statement,
+# so there the lists are cut to leave room for the query's other parameters
+BULK_ID_CHUNK_SIZE = 10000
+SQLITE_BULK_ID_CHUNK_SIZE = SQLITE_MAX_VARIABLES - 99
+
+def chunked_ids(ids):
+    size = SQLITE_BULK_ID_CHUNK_SIZE if db.engine.dialect.name == 'sqlite' else BULK_ID_CHUNK_SIZE
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+def parse_bulk_container_ids(values):
+    """Container ids sent to a bulk endpoint, as unique ints in the order given, plus error messages"""
+    container_ids = []
+    seen = set()
+    error_messages = []
+    for value in values:
+        try:
+            container_id = int(value)
+        except (TypeError, ValueError):
+            error_messages.append(f"Container ID {value} not found")
+            continue
+        if container_id not in seen:
+            seen.add(container_id)
+            container_ids.append(container_id)
+    return container_ids, error_messages
+
+def bulk_request_filter(data):
+    """The dashboard query for a bulk request that sends ``filter`` instead of ``container_ids``.
+
+    ``filter`` holds the dashboard's location, status, full_type and search
+    parameters, and the query matches what index() lists for them on every
+    page. The endpoints apply it as a subquery, so acting on thousands of
+    containers never reads their ids into Python. Returns (query, error
+    message); the query is None when the request lists container_ids.
+    """
+    spec = data.get('filter')
+    if spec is None:
+        return None, None
+    if not isinstance(spec, dict):
+        return None, 'The filter must be an object of dashboard filters'
+    values = {name: spec.get(name, default) for name, default in
+              (('location', 'Moroni'), ('status', ''), ('full_type', 'all'), ('search', ''))}
+    if not all(value is None or isinstance(value, str) for value in values.values()):
+        return None, 'The filter values must be strings'
+    return filtered_containers_query(
+        map_location_codes(values['location'] or ''),
+        values['status'] or '',
+        values['full_type'] or 'all',
+        (values['search'] or '').strip()
+    ), None
+
+def matching_container_ids(matching):
+    """select() of the ids matching a bulk request filter, as a container_id column"""
+    return matching.with_entities(Container.id.label('container_id')).statement
+
+def fetch_bulk_containers(container_ids):
+    """The selected containers with their current state, in one query (per chunk of ids), keyed by id.
+
+    Each row has id, container_number, status, status_location (the latest
+    status's location as entered, before location codes are mapped),
+    current_vessel_id and on_departed_vessel. Ids that don't exist are missing.
+    """
+    containers = {}
+    for chunk in chunked_ids(container_ids):
+        containers.update((row.id, row) for row in db.session.execute(
+            db.select(Container.id, Container.container_number, ContainerCurrentState.status,
+                      ContainerStatus.location.label('status_location'),
+                      ContainerCurrentState.current_vessel_id, ContainerCurrentState.on_departed_vessel)
+            .outerjoin(ContainerCurrentState, ContainerCurrentState.container_id == Container.id)
+            .outerjoin(ContainerStatus, ContainerStatus.id == ContainerCurrentState.status_id)
+            .where(Container.id.in_(chunk))
+        ))
+    return containers
+
 @app.route('/containers/bulk-load', methods=['POST'])
 @login_required
 def bulk_load_containers():
     """Endpoint for bulk loading multiple containers onto a vessel"""
     data = request.json
-    container_ids = data.get('container_ids', [])
-    vessel_id = data.get('vessel_id')
     operation_date = datetime.strptime(data.get('operation_date'), '%Y-%m-%d')
     location = data.get('location')
     notes = data.get('notes', '')
     
     # Validate vessel
-    vessel = Vessel.query.get(vessel_id)
+    vessel = db.session.get(Vessel, data.get('vessel_id'))
     if not vessel:
         return jsonify({'error': 'Invalid vessel selected'}), 400
     # Check if vessel has departed
     if vessel.status == 'Departed':
         return jsonify({'error': 'Cannot load containers onto a departed vessel'}), 400
     
-    success_count = 0
-    error_messages = []
-    skipped_count = 0
-    
-    for container_id in container_ids:
+    matching, error = bulk_request_filter(data)
+    if error:
+        return jsonify({'error': error}), 400
+    if matching is not None:
+        # Every matching container that is where the vessel is and not on a vessel yet,
+        # checked and written in SQL; the rest are counted as skipped
+        to_load = matching.outerjoin(ContainerStatus, ContainerStatus.id == ContainerCurrentState.status_id)\
+            .filter(ContainerCurrentState.current_vessel_id == None,
+                    ContainerStatus.location == vessel.current_location)
+        matching_count = matching.count()
         try:
-            container = Container.query.get(container_id)
-            if not container:
-                error_messages.append(f"Container ID {container_id} not found")
-                continue
-            
-            # Check container location against vessel location
-            current_status = container.get_current_status()
-            if not current_status or current_status.location != vessel.current_location:
-                skipped_count += 1
-                error_messages.append(f"Container {container.container_number} is in a different location than vessel")
-                continue
-                
-            # Create container movement record 
-            movement = ContainerMovement(
-                operation_type='load',
-                operation_date=operation_date,
-                location=location,
-                notes=notes,
-                container_id=container_id,
-                vessel_id=vessel_id   
-            )
-            
-            # Update container status
-            status = ContainerStatus(
-                status='loaded',
-                date=operation_date,
-                location=location,
-                notes=notes,
-                container_id=container_id
+            success_count = insert_history_from_select(
+                matching_container_ids(to_load), 'load', 'loaded', vessel.id, operation_date, location, notes, notes
             )
-            
-            db.session.add(movement)
-            db.session.add(status)
-            success_count += 1
-            
+            db.session.commit()
+            clear_count_cache()
         except Exception as e:
-            error_messages.append(f"Error with container ID {container_id}: {str(e)}")
-                
+            db.session.rollback()
+            return jsonify({'error': f"Database error: {str(e)}"}), 500
+        skipped_count = matching_count - success_count
+        return jsonify({
+            'success_count': success_count,
+            'error_count': 0,
+            'skipped_count': skipped_count,
+            'message': f"Loaded {success_count} containers. Skipped {skipped_count} containers due to location "
+                       f"mismatch or because they are already loaded."
+        })
+    
+    # All selected containers and their latest status in one query
+    container_ids, error_messages = parse_bulk_container_ids(data.get('container_ids', []))
+    containers = fetch_bulk_containers(container_ids)
+    error_count = len(error_messages)
+    skipped_count = 0
+    status_rows = []
+    movement_rows = []
+    
+    for container_id in container_ids:
+        container = containers.get(container_id)
+        if container is None:
+            error_count += 1
+            error_messages.append(f"Container ID {container_id} not found")
+            continue
+        
+        # Containers already on a vessel (departed or not) have to be discharged first
+        if container.current_vessel_id is not None:
+            skipped_count += 1
+            error_messages.append(f"Container {container.container_number} is already loaded on a vessel")
+            continue
+        
+        # Check container location against vessel location
+        if container.status_location is None or container.status_location != vessel.current_location:
+            skipped_count += 1
+            error_messages.append(f"Container {container.container_number} is in a different location than vessel")
+            continue
+        
+        # Queue container movement and status rows for one bulk insert
+        movement_rows.append({
+            'operation_type': 'load',
+            'operation_date': operation_date,
+            'location': location,
+            'notes': notes,
+            'container_id': container_id,
+            'vessel_id': vessel.id
+        })
+        status_rows.append({
+            'status': 'loaded',
+            'date': operation_date,
+            'location': location,
+            'notes': notes,
+            'container_id': container_id
+        })
+    
+    success_count = len(status_rows)
     if success_count > 0:
         try:
+            insert_container_history(status_rows, movement_rows)
             db.session.commit()
+            clear_count_cache()
         except Exception as e:
             db.session.rollback()
             return jsonify({'error': f"Database error: {str(e)}"}), 500
             
     result = {
         'success_count': success_count,
-        'error_count': len(container_ids) - success_count - skipped_count,
+        'error_count': error_count,
         'skipped_count': skipped_count,
-        'message': f"Loaded {success_count} containers. Skipped {skipped_count} containers due to location mismatch."
+        'message': f"Loaded {success_count} containers. Skipped {skipped_count} containers due to location "
+                   f"mismatch or because they are already loaded."
     }
     
     if error_messages:
@@ -2286,68 +3314,226 @@ def get_container_vessel_info(id):
 def bulk_discharge_containers():
     """Endpoint for bulk discharging multiple containers from a vessel"""
     data = request.json
-    container_ids = data.get('container_ids', [])
-    vessel_id = data.get('vessel_id')
     operation_date = datetime.strptime(data.get('operation_date'), '%Y-%m-%d')
     location = data.get('location')
     notes = data.get('notes', '')
     
     # Validate vessel
-    vessel = Vessel.query.get(vessel_id)
+    vessel = db.session.get(Vessel, data.get('vessel_id'))
     if not vessel:
         return jsonify({'error': 'Invalid vessel selected'}), 400
     
-    success_count = 0
-    error_messages = []
-    
-    for container_id in container_ids:
+    matching, error = bulk_request_filter(data)
+    if error:
+        return jsonify({'error': error}), 400
+    if matching is not None:
+        # The matching containers on board this vessel, discharged in SQL; the rest are skipped
+        on_board = matching.filter(ContainerCurrentState.current_vessel_id == vessel.id)
+        matching_count = matching.count()
         try:
-            container = Container.query.get(container_id)
-            if not container:
-                error_messages.append(f"Container ID {container_id} not found")
-                continue
-            # Create container movement record 
-            movement = ContainerMovement(
-                operation_type='discharge',
-                operation_date=operation_date,
-                location=location,
-                notes=notes,
-                container_id=container_id,
-                vessel_id=vessel_id   
-            )
-            # Update container status
-            status = ContainerStatus(
-                status='discharged',
-                date=operation_date,
-                location=location,
-                notes=f"Discharged from vessel {vessel.name} (bulk operation)",
-                container_id=container_id   
+            success_count = insert_history_from_select(
+                matching_container_ids(on_board), 'discharge', 'discharged', vessel.id, operation_date, location,
+                notes, f"Discharged from vessel {vessel.name} (bulk operation)"
             )
-            
-            # Remove setting stripping date on discharge - will be set when emptied
-            
-            db.session.add(movement)
-            db.session.add(status)
-            success_count += 1
+            db.session.commit()
+            clear_count_cache()
         except Exception as e:
-            error_messages.append(f"Error with container ID {container_id}: {str(e)}")
-                
+            db.session.rollback()
+            return jsonify({'error': f"Database error: {str(e)}"}), 500
+        skipped_count = matching_count - success_count
+        return jsonify({
+            'success_count': success_count,
+            'error_count': 0,
+            'skipped_count': skipped_count,
+            'message': f"Discharged {success_count} containers. Skipped {skipped_count} containers that are not "
+                       f"loaded on {vessel.name}."
+        })
+    
+    container_ids, error_messages = parse_bulk_container_ids(data.get('container_ids', []))
+    error_count = len(error_messages)
+    
+    # Only containers whose latest movement is a load onto this vessel can be discharged from it
+    on_board = set()
+    for chunk in chunked_ids(container_ids):
+        on_board.update(db.session.scalars(
+            db.select(ContainerCurrentState.container_id)
+            .where(ContainerCurrentState.current_vessel_id == vessel.id,
+                   ContainerCurrentState.container_id.in_(chunk))
+        ))
+    
+    # The rest are reported from the set difference: skipped if they exist, errors if not
+    not_on_board = [container_id for container_id in container_ids if container_id not in on_board]
+    numbers = {}
+    for chunk in chunked_ids(not_on_board):
+        numbers.update(db.session.execute(
+            db.select(Container.id, Container.container_number).where(Container.id.in_(chunk))
+        ).all())
+    skipped_count = len(numbers)
+    error_count += len(not_on_board) - skipped_count
+    for container_id in not_on_board:
+        if container_id in numbers:
+            error_messages.append(f"Container {numbers[container_id]} is not loaded on vessel {vessel.name}")
+        else:
+            error_messages.append(f"Container ID {container_id} not found")
+    
+    # Queue container movement and status rows for one bulk insert
+    discharged = [container_id for container_id in container_ids if container_id in on_board]
+    movement_rows = [{
+        'operation_type': 'discharge',
+        'operation_date': operation_date,
+        'location': location,
+        'notes': notes,
+        'container_id': container_id,
+        'vessel_id': vessel.id
+    } for container_id in discharged]
+    status_rows = [{
+        'status': 'discharged',
+        'date': operation_date,
+        'location': location,
+        'notes': f"Discharged from vessel {vessel.name} (bulk operation)",
+        'container_id': container_id
+    } for container_id in discharged]
+    # Remove setting stripping date on discharge - will be set when emptied
+    
+    success_count = len(discharged)
     if success_count > 0:
         try:
+            insert_container_history(status_rows, movement_rows)
             db.session.commit()
+            clear_count_cache()
         except Exception as e:
             db.session.rollback()
             return jsonify({'error': f"Database error: {str(e)}"}), 500
     result = {
         'success_count': success_count,
-        'error_count': len(container_ids) - success_count,
-        'message': f"Discharged {success_count} containers."
+        'error_count': error_count,
+        'skipped_count': skipped_count,
+        'message': f"Discharged {success_count} containers. Skipped {skipped_count} containers that are not "
+                   f"loaded on {vessel.name}."
     }
     
     if error_messages:
         result['errors'] = error_messages
     return jsonify(result)
 
+def insert_history_from_select(container_ids, operation_type, status, vessel_id, operation_date, location,
+                               notes, status_notes):
+    """Give every container in ``container_ids`` (a select() of ids) a movement and a status, with INSERT ... SELECT.
+
+    With no ``operation_type`` only the statuses are written. Nothing is read
+    back into Python, so the time taken doesn't depend on how many containers
+    match. Both inserts run before the state rows are refreshed, so a select
+    of ids that reads container_current_state sees the same containers twice.
+    Returns the number of containers written.
+    """
+    connection = db.session.connection()
+    now = datetime.utcnow()
+    ids = container_ids.subquery()
+    movement_table = ContainerMovement.__table__
+    status_table = ContainerStatus.__table__
+
+    if operation_type:
+        connection.execute(movement_table.insert().from_select(
+            ['operation_type', 'operation_date', 'location', 'notes', 'created_at', 'container_id', 'vessel_id'],
+            db.select(db.literal(operation_type, db.String), db.literal(operation_date, db.DateTime),
+                      db.literal(location, db.String), db.literal(notes, db.Text), db.literal(now, db.DateTime),
+                      ids.c.container_id, db.literal(vessel_id, db.Integer))
+        ))
+    written = connection.execute(status_table.insert().from_select(
+        ['status', 'date', 'location', 'notes', 'created_at', 'container_id'],
+        db.select(db.literal(status, db.String), db.literal(operation_date, db.DateTime),
+                  db.literal(location, db.String), db.literal(status_notes, db.Text), db.literal(now, db.DateTime),
+                  ids.c.container_id)
+    )).rowcount
+
+    # The statuses just written identify the containers whose state changed
+    refresh_container_state(
+        db.select(status_table.c.container_id).where(
+            status_table.c.status == status,
+            status_table.c.created_at == now
+        ),
+        connection
+    )
+    return written
+
+@app.route('/vessels/<int:id>/discharge-all', methods=['POST'])
+@login_required
+def discharge_vessel(id):
+    """Discharge every container currently loaded on a vessel, entirely in SQL"""
+    vessel = db.session.get(Vessel, id)
+    if not vessel:
+        return jsonify({'error': 'Invalid vessel selected'}), 400
+    data = request.json or {}
+    operation_date = datetime.strptime(data.get('operation_date'), '%Y-%m-%d')
+    location = data.get('location') or vessel.current_location
+    notes = data.get('notes', '')
+    if not location:
+        return jsonify({'error': 'Enter the port the containers are discharged at'}), 400
+    
+    # Containers whose latest movement is a load onto this vessel
+    on_board = db.select(ContainerCurrentState.container_id.label('container_id'))\
+        .where(ContainerCurrentState.current_vessel_id == vessel.id)
+    try:
+        success_count = insert_history_from_select(
+            on_board, 'discharge', 'discharged', vessel.id, operation_date, location, notes,
+            f"Discharged from vessel {vessel.name} (bulk operation)"
+        )
+        db.session.commit()
+        clear_count_cache()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f"Database error: {str(e)}"}), 500
+    
+    return jsonify({
+        'success_count': success_count,
+        'message': f"Discharged {success_count} containers from {vessel.name} at {location}."
+    })
+
+@app.route('/vessels/<int:id>/load-all', methods=['POST'])
+@login_required
+def load_vessel(id):
+    """Load every container at the vessel's port that matches a dashboard filter, entirely in SQL.
+
+    Takes the port (``location``, default: the vessel's current location)
+    plus the dashboard's ``status``, ``full_type`` and ``search`` filters.
+    """
+    vessel = db.session.get(Vessel, id)
+    if not vessel:
+        return jsonify({'error': 'Invalid vessel selected'}), 400
+    if vessel.status == 'Departed':
+        return jsonify({'error': 'Cannot load containers onto a departed vessel'}), 400
+    data = request.json or {}
+    operation_date = datetime.strptime(data.get('operation_date'), '%Y-%m-%d')
+    notes = data.get('notes', '')
+    vessel_port = map_location_codes(vessel.current_location or '')
+    port = map_location_codes(data.get('location') or vessel_port)
+    # Same rule as a bulk load: containers have to be where the vessel is
+    if not port or port != vessel_port:
+        return jsonify({'error': f"{vessel.name} is not at {port or 'an unknown port'}"}), 400
+    
+    # Containers at the port matching the filter; the ones already on a vessel are skipped
+    matching = filtered_containers_query(port, data.get('status', ''), data.get('full_type', 'all'),
+                                         (data.get('search') or '').strip())
+    to_load = matching.filter(ContainerCurrentState.current_vessel_id == None)\
+        .with_entities(Container.id.label('container_id'))
+    skipped_count = matching.filter(ContainerCurrentState.current_vessel_id != None).count()
+    try:
+        success_count = insert_history_from_select(
+            to_load.statement, 'load', 'loaded', vessel.id, operation_date, vessel.current_location, notes, notes
+        )
+        db.session.commit()
+        clear_count_cache()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f"Database error: {str(e)}"}), 500
+    
+    return jsonify({
+        'success_count': success_count,
+        'skipped_count': skipped_count,
+        'message': f"Loaded {success_count} containers onto {vessel.name}. "
+                   f"Skipped {skipped_count} containers that are already loaded."
+    })
+
 @app.route('/update_vessel_statuses')
 @login_required
 def update_vessel_statuses():
@@ -2366,11 +3552,7 @@ def update_vessel_statuses():
                 vessel.current_destination = "---"
             
             # Update arrival date for all containers on this vessel
-            loaded_containers = vessel.get_loaded_containers()
-            container_count = 0
-            for container in loaded_containers:
-                container.arrival_date = vessel.eta or today
-                container_count += 1
+            container_count = vessel.propagate_arrival_date(vessel.eta or today)
             
             if container_count > 0:
                 logger.info(f"Updated arrival date for {container_count} containers to match vessel arrival.")
@@ -2396,11 +3578,9 @@ def update_vessel_statuses_auto(vessel_id=None):
                     vessel.current_destination = ""
                 
                 # Update arrival date for all containers on this vessel
-                loaded_containers = vessel.get_loaded_containers()
-                for container in loaded_containers:
-                    # Use vessel's ETA as the arrival date, not today's date
-                    container.arrival_date = vessel.eta
-                    logger.info(f"Updated arrival date for container {container.container_number} to match vessel {vessel.name}'s arrival date: {vessel.eta}")
+                # Use vessel's ETA as the arrival date, not today's date
+                container_count = vessel.propagate_arrival_date(vessel.eta)
+                logger.info(f"Updated arrival date for {container_count} containers to match vessel {vessel.name}'s arrival date: {vessel.eta}")
                 
                 updated = True
         else:
@@ -2415,12 +3595,8 @@ def update_vessel_statuses_auto(vessel_id=None):
                         vessel.current_destination = ""
                     
                     # Update arrival date for all containers on this vessel
-                    loaded_containers = vessel.get_loaded_containers()
-                    container_count = 0
-                    for container in loaded_containers:
-                        # Use vessel's ETA as the arrival date, not today's date
-                        container.arrival_date = vessel.eta
-                        container_count += 1
+                    # Use vessel's ETA as the arrival date, not today's date
+                    container_count = vessel.propagate_arrival_date(vessel.eta)
                     
                     if container_count > 0:
                         logger.info(f"Updated arrival date for {container_count} containers on vessel {vessel.name} to {vessel.eta}")
@@ -2434,6 +3610,226 @@ def update_vessel_statuses_auto(vessel_id=None):
         db.session.rollback()
         logger.error(f"Error auto-updating vessel statuses: {str(e)}")
 
+# Identifies this process as a scheduler lock holder
+SCHEDULER_OWNER = f"{socket.gethostname()}:{os.getpid()}"
+VESSEL_STATUS_LOCK = 'vessel_status_update'
+
+def acquire_scheduler_lock(name, owner, ttl):
+    """Take or renew the named lock for `ttl` seconds; returns True if `owner` now holds it.
+
+    Runs on its own connection so it never shares a transaction with request work.
+    """
+    now = datetime.utcnow()
+    table = SchedulerLock.__table__
+    with db.engine.begin() as connection:
+        result = connection.execute(
+            table.update()
+            .where(table.c.name == name)
+            .where(db.or_(table.c.owner == owner, table.c.expires_at < now))
+            .values(owner=owner, expires_at=now + timedelta(seconds=ttl))
+        )
+        if result.rowcount:
+            return True
+        if connection.execute(db.select(table.c.name).where(table.c.name == name)).first():
+            return False
+    try:
+        with db.engine.begin() as connection:
+            connection.execute(table.insert().values(
+                name=name, owner=owner, expires_at=now + timedelta(seconds=ttl)
+            ))
+        return True
+    except sqlalchemy.exc.IntegrityError:
+        # Another process created the lock row first
+        return False
+
+def release_scheduler_lock(name, owner):
+    """Give up the named lock if `owner` holds it"""
+    table = SchedulerLock.__table__
+    with db.engine.begin() as connection:
+        connection.execute(
+            table.update()
+            .where(table.c.name == name, table.c.owner == owner)
+            .values(expires_at=datetime.utcnow())
+        )
+
+def run_vessel_status_job(owner=None):
+    """Scheduled ETA check: runs update_vessel_statuses_auto() if this process holds the lock.
+
+    The lease lasts two intervals, so the holder keeps renewing it while other
+    workers and nodes skip their runs. Returns True if the update ran.
+    """
+    owner = owner or SCHEDULER_OWNER
+    ttl = 2 * app.config['VESSEL_STATUS_INTERVAL']
+    with app.app_context():
+        if not acquire_scheduler_lock(VESSEL_STATUS_LOCK, owner, ttl):
+            return False
+        update_vessel_statuses_auto()
+        return True
+
+vessel_status_scheduler = IntervalScheduler(
+    app.config['VESSEL_STATUS_INTERVAL'], run_vessel_status_job, name='vessel-status-scheduler'
+)
+
+# An import that keeps failing (e.g. crashes its worker) is given up after this many tries
+IMPORT_JOB_MAX_ATTEMPTS = 3
+
+class ImportJobLost(Exception):
+    """Raised when another worker has taken over the import job being processed"""
+
+def claim_import_job(owner):
+    """Take the oldest queued import job, or a running one whose worker stopped reporting progress.
+
+    Returns the job id, or None when there is nothing to do. The conditional
+    UPDATE makes sure only one worker gets each job.
+    """
+    table = ImportJob.__table__
+    now = datetime.utcnow()
+    stale_before = now - timedelta(seconds=app.config['IMPORT_JOB_STALE_AFTER'])
+    claimable = db.or_(
+        table.c.status == 'queued',
+        db.and_(table.c.status == 'running', table.c.heartbeat_at < stale_before)
+    )
+    with db.engine.begin() as connection:
+        job_id = connection.execute(
+            db.select(table.c.id).where(claimable).order_by(table.c.id).limit(1)
+        ).scalar()
+        if job_id is None:
+            return None
+        result = connection.execute(
+            table.update()
+            .where(table.c.id == job_id, claimable)
+            .values(status='running', worker=owner, heartbeat_at=now, attempts=table.c.attempts + 1,
+                    started_at=db.func.coalesce(table.c.started_at, now))
+        )
+        return job_id if result.rowcount else None
+
+def _finish_import_job(job_id, owner, status, error_message=None):
+    table = ImportJob.__table__
+    with db.engine.begin() as connection:
+        connection.execute(
+            table.update()
+            .where(table.c.id == job_id, table.c.worker == owner)
+            .values(status=status, error_message=error_message, finished_at=datetime.utcnow())
+        )
+
+def run_import_job(job_id, owner=None):
+    """Process a claimed import job, resuming after its last committed batch"""
+    owner = owner or SCHEDULER_OWNER
+    table = ImportJob.__table__
+    with app.app_context():
+        job = db.session.get(ImportJob, job_id)
+        filepath = job.file_path()
+        def record_progress(stats):
+            # Same transaction as the batch; also renews the job's heartbeat
+            result = db.session.execute(
+                table.update()
+                .where(table.c.id == job_id, table.c.worker == owner)
+                .values(total_rows=stats['total_rows'], rows_parsed=stats['rows_parsed'],
+                        rows_inserted=stats['rows_inserted'], rows_skipped=stats['rows_skipped'],
+                        rows_updated=stats.get('rows_updated', 0), rows_unchanged=stats.get('rows_unchanged', 0),
+                        rows_failed=stats.get('rows_failed', 0), failed_rows=json.dumps(stats.get('failed_rows', [])),
+                        clients_created=stats['clients_created'], has_status=stats['has_status'],
+                        vessels_not_found=json.dumps(sorted(stats['vessels_not_found'])),
+                        source_count=stats.get('source_count', 1),
+                        skipped_sources=json.dumps(stats.get('skipped_sources', [])),
+                        error_count=stats.get('error_count', 0), warning_count=stats.get('warning_count', 0),
+                        heartbeat_at=datetime.utcnow())
+            )
+            if not result.rowcount:
+                raise ImportJobLost(f"Import job {job_id} was taken over by another worker")
+
+        # Batches renew the heartbeat too, but reading a large or multi-file upload
+        # before the first one (or one slow batch) can take longer than
+        # IMPORT_JOB_STALE_AFTER, so a timer also renews it while the job runs
+        engine = db.engine
+
+        def renew_heartbeat():
+            try:
+                # Its own connection, outside the batch's transaction
+                with engine.begin() as connection:
+                    connection.execute(
+                        table.update()
+                        .where(table.c.id == job_id, table.c.worker == owner, table.c.status == 'running')
+                        .values(heartbeat_at=datetime.utcnow())
+                    )
+            except OperationalError as e:
+                # SQLite locks the whole database while a batch is written; that batch's commit renews it
+                logger.debug(f"Import job {job_id}: heartbeat skipped: {e}")
+
+        heartbeat = IntervalScheduler(max(1, app.config['IMPORT_JOB_STALE_AFTER'] / 4), renew_heartbeat,
+                                      name=f'import-job-{job_id}-heartbeat')
+        heartbeat.start()
+
+        logger.info(f"Import job {job_id}: importing {job.filename} from row {job.rows_parsed}")
+        try:
+            if job.attempts > IMPORT_JOB_MAX_ATTEMPTS:
+                raise ImportFileError(f"Gave up after {IMPORT_JOB_MAX_ATTEMPTS} attempts")
+            if filepath is None:
+                raise ImportFileError("The upload is no longer available, please upload the file again")
+            if job.dry_run:
+                # Nothing was written, so a dry run that was interrupted simply starts over
+                job.report_name = f"import_job_{job_id}_report.csv"
+                db.session.commit()
+                stats = validate_containers_file(filepath, job.filename, job.report_path(), record_progress,
+                                                 sheet_name=job.sheet_name, skip_rows=job.skip_rows or 0,
+                                                 upsert=job.mode == 'upsert', all_sheets=job.all_sheets)
+            else:
+                stats = import_containers_file(filepath, job.filename, job.import_stats(), record_progress,
+                                               sheet_name=job.sheet_name, skip_rows=job.skip_rows or 0,
+                                               upsert=job.mode == 'upsert', all_sheets=job.all_sheets)
+        except ImportJobLost as e:
+            # The other worker carries on with the job and its file
+            logger.warning(str(e))
+            return
+        except ImportFileError as e:
+            db.session.rollback()
+            _finish_import_job(job_id, owner, 'failed', str(e))
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Import job {job_id} failed: {str(e)}", exc_info=True)
+            _finish_import_job(job_id, owner, 'failed', str(e))
+        else:
+            _finish_import_job(job_id, owner, 'completed')
+            if job.dry_run:
+                logger.info(f"Import job {job_id}: validated {stats['rows_parsed']} rows, "
+                            f"{stats['error_count']} errors and {stats['warning_count']} warnings")
+            else:
+                logger.info(f"Import job {job_id}: imported {stats['rows_inserted']} containers, "
+                            f"skipped {stats['rows_skipped']}")
+        finally:
+            heartbeat.stop()
+
+        # Delete the file after processing
+        if job.stored_name:
+            try:
+                os.remove(job.file_path())
+            except Exception as e:
+                logger.error(f"Error removing temporary file: {str(e)}")
+
+def run_import_jobs(owner=None):
+    """Scheduled import runner: process queued jobs until none are left; returns how many ran"""
+    owner = owner or SCHEDULER_OWNER
+    count = 0
+    with app.app_context():
+        while True:
+            job_id = claim_import_job(owner)
+            if job_id is None:
+                return count
+            run_import_job(job_id, owner)
+            count += 1
+
+import_job_runner = IntervalScheduler(
+    app.config['IMPORT_POLL_INTERVAL'], run_import_jobs, name='import-job-runner'
+)
+
+@app.before_request
+def start_background_scheduler():
+    """Start the in-app scheduler in serving processes (scripts importing app don't run it)"""
+    if app.config['SCHEDULER_ENABLED'] and not vessel_status_scheduler.running:
+        vessel_status_scheduler.start()
+    if app.config['IMPORT_WORKER_ENABLED'] and not import_job_runner.running:
+        import_job_runner.start()
+
 @app.route('/admin')
 @login_required        
 def admin_panel():
@@ -2922,7 +4318,9 @@ def admin_reset_db():
             total_deleted += len(id_list)
             logger.info(f"Deleted {total_deleted} container movements")
         
-        # 6. Delete containers
+        # 6. Delete container current state rows and then containers
+        ContainerCurrentState.query.delete(synchronize_session=False)
+        db.session.commit()
         total_deleted = 0
         flash(progress_message + "Containers...", 'info')
         while True:
@@ -2999,48 +4397,78 @@ def admin_reset_db():
 def bulk_status_update():
     """Endpoint for bulk updating container statuses"""
     data = request.json
-    container_ids = data.get('container_ids', [])
     status = data.get('status')
     operation_date = datetime.strptime(data.get('date'), '%Y-%m-%d')
     location = data.get('location')
     notes = data.get('notes', '')
     
-    success_count = 0
-    error_messages = []
-    
-    for container_id in container_ids:
+    matching, error = bulk_request_filter(data)
+    if error:
+        return jsonify({'error': error}), 400
+    if matching is not None:
+        # Every matching container gets the status in SQL
+        matching_ids = matching_container_ids(matching)
         try:
-            container = Container.query.get(container_id)
-            if not container:
-                error_messages.append(f"Container ID {container_id} not found")
-                continue
-            # Create new status record
-            new_status = ContainerStatus(
-                status=status,
-                date=operation_date,
-                location=location,
-                notes=notes,
-                container_id=container_id
-            )
-            db.session.add(new_status)
-            
-            # Set stripping date if status is emptied
+            # The stripping date goes first, while the filter still sees the containers' old status
             if status == 'emptied':
-                container.stripping_date = operation_date
-                
-            success_count += 1
+                db.session.execute(
+                    db.update(Container)
+                    .where(Container.id.in_(matching_ids.correlate(None)))
+                    .values(stripping_date=operation_date)
+                    .execution_options(synchronize_session=False)
+                )
+            success_count = insert_history_from_select(
+                matching_ids, None, status, None, operation_date, location, None, notes
+            )
+            db.session.commit()
+            clear_count_cache()
         except Exception as e:
-            error_messages.append(f"Error with container ID {container_id}: {str(e)}")
-                
+            db.session.rollback()
+            return jsonify({'error': f"Database error: {str(e)}"}), 500
+        return jsonify({
+            'success_count': success_count,
+            'error_count': 0,
+            'message': f"Updated status for {success_count} containers."
+        })
+    
+    # Which of the selected containers exist, one query per chunk of ids
+    container_ids, error_messages = parse_bulk_container_ids(data.get('container_ids', []))
+    existing = set()
+    for chunk in chunked_ids(container_ids):
+        existing.update(db.session.scalars(db.select(Container.id).where(Container.id.in_(chunk))))
+    error_messages += [f"Container ID {container_id} not found"
+                       for container_id in container_ids if container_id not in existing]
+    updated = [container_id for container_id in container_ids if container_id in existing]
+    
+    success_count = len(updated)
     if success_count > 0:
         try:
+            # The new status records in one multi-row insert
+            insert_container_history({
+                'status': status,
+                'date': operation_date,
+                'location': location,
+                'notes': notes,
+                'container_id': container_id
+            } for container_id in updated)
+            
+            # Set stripping date if status is emptied, with one UPDATE instead of per container
+            if status == 'emptied':
+                for chunk in chunked_ids(updated):
+                    db.session.execute(
+                        db.update(Container)
+                        .where(Container.id.in_(chunk))
+                        .values(stripping_date=operation_date)
+                        .execution_options(synchronize_session=False)
+                    )
             db.session.commit()
+            clear_count_cache()
         except Exception as e:
             db.session.rollback()
             return jsonify({'error': f"Database error: {str(e)}"}), 500
     result = {
         'success_count': success_count,
-        'error_count': len(container_ids) - success_count,
+        'error_count': len(error_messages),
         'message': f"Updated status for {success_count} containers."
     }
     
@@ -3141,6 +4569,21 @@ def initialize_app():
         # Create the template
         create_import_template(static_template_path)
         logger.info(f"Created container import template at {static_template_path}")
+    
+    # Create the scheduler lock and import job tables on databases that predate them
+    # (the web workers and worker.py coordinate through them from the start)
+    try:
+        SchedulerLock.__table__.create(db.engine, checkfirst=True)
+        ImportJob.__table__.create(db.engine, checkfirst=True)
+    except Exception as e:
+        logger.error(f"Error creating the scheduler lock and import job tables: {str(e)}")
+
+    # Make sure the container current state read model exists and is populated
+    try:
+        ensure_container_state()
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error preparing container current state: {str(e)}")
 
 # Call initialize_app at application startup
 with app.app_context():
@@ -3680,7 +5123,7 @@ def admin_delivery_orders():
     
     # Get all containers that have print history matching our filters
     # CHANGE: Show ALL containers with print history, regardless of current status
-    containers = Container.query.filter(Container.id.in_(containers_with_prints)).all()
+    containers = prefetch_container_state(Container.query.filter(Container.id.in_(containers_with_prints)).all())
     
     # For each container, get its print history (with date filter)
     container_print_data = []
@@ -3816,26 +5259,12 @@ def admin_reports():
         end_date = datetime.now().replace(hour=23, minute=59, second=59)
     
     # Get basic statistics for the dashboard
-    total_container_count = Container.query.count()
-    
-    # Get latest status subquery (reuse from other queries)
-    latest_status_subquery = db.session.query(
-        ContainerStatus.container_id,
-        db.func.max(ContainerStatus.created_at).label('max_date')
-    ).group_by(ContainerStatus.container_id).subquery('latest_status')
+    summary = container_status_summary()
+    total_container_count = summary['total']
     
     # Count containers by status
-    status_counts = {}
-    for status in ['loaded', 'discharged', 'emptied', 'full']:
-        count = db.session.query(Container)\
-            .join(latest_status_subquery, Container.id == latest_status_subquery.c.container_id)\
-            .join(ContainerStatus, db.and_(
-                ContainerStatus.container_id == latest_status_subquery.c.container_id,
-                ContainerStatus.created_at == latest_status_subquery.c.max_date,
-                ContainerStatus.status == status
-            ))\
-            .count()
-        status_counts[status] = count
+    status_counts = {status: summary['by_status'].get(status, 0)
+                     for status in ['loaded', 'discharged', 'emptied', 'full']}
     
     # Add client statistics
     client_count = Client.query.count()
@@ -3950,8 +5379,7 @@ def admin_reports():
         discharged = len(discharged_container_ids)
         
         # Calculate remaining containers (still on vessel)
-        remaining = vessel.get_loaded_containers()
-        remaining_count = len(remaining)
+        remaining_count = vessel.count_loaded_containers()
         
         # Get loading ports distribution
         loading_ports = {}
@@ -4081,21 +5509,8 @@ def container_status_data():
     if not current_user.is_admin:
         return jsonify({'error': 'Unauthorized'}), 403
     
-    # Get latest status subquery
-    latest_status_subquery = db.session.query(
-        ContainerStatus.container_id,
-        db.func.max(ContainerStatus.created_at).label('max_date')
-    ).group_by(ContainerStatus.container_id).subquery('latest_status')
-    
     # Get container counts by status
-    status_data = db.session.query(
-        ContainerStatus.status,
-        db.func.count(Container.id)
-    ).join(latest_status_subquery, ContainerStatus.container_id == latest_status_subquery.c.container_id)\
-     .filter(ContainerStatus.created_at == latest_status_subquery.c.max_date)\
-     .join(Container, Container.id == ContainerStatus.container_id)\
-     .group_by(ContainerStatus.status)\
-     .all()
+    status_data = sorted(container_status_summary()['by_status'].items())
     
     # Define a mapping of status to color to ensure consistency
     status_colors = {
@@ -4271,54 +5686,37 @@ def clients():
             )
         )
     
-    # Apply sorting
-    if sort_by == 'name':
-        if sort_order == 'desc':
-            clients_query = clients_query.order_by(Client.name.desc())
-        else:
-            clients_query = clients_query.order_by(Client.name)
-    elif sort_by == 'containers':
-        # More complex sorting by container count
-        # SQLAlchemy doesn't directly support this kind of sorting
-        # Instead, get all clients and sort in Python
-        all_clients = clients_query.all()
-        for client in all_clients:
-            client.container_count = client.get_container_count()
-        
-        all_clients.sort(key=lambda c: c.container_count, 
-                        reverse=(sort_order == 'desc'))
-        
-        # Create pagination manually
-        from pagination import Pagination
-        total_count = len(all_clients)
-        start = (page - 1) * per_page
-        end = min(start + per_page, total_count)
-        
-        client_list = all_clients[start:end]
-        # Fix: Update pagination initialization to match expected parameters
-        pagination = Pagination(client_list, page, per_page, 'clients', 
-                               sort=sort_by, order=sort_order, search=search_term)
-        
-        return render_template('clients.html',
-                            clients=client_list,
-                            pagination=pagination,
-                            sort_by=sort_by,
-                            sort_order=sort_order)
+    # Sort keys (never NULL, ending with the id) so the list can use keyset pagination
+    descending = sort_order == 'desc'
+    if sort_by == 'containers':
+        # Sort by container count with a correlated subquery instead of loading every client
+        container_count = db.select(db.func.count(Container.id))\
+            .where(Container.client_id == Client.id)\
+            .correlate(Client).scalar_subquery()
+        sort_keys = [(container_count, descending)]
     elif sort_by == 'created_at':
-        if sort_order == 'desc':
-            clients_query = clients_query.order_by(Client.created_at.desc())
-        else:
-            clients_query = clients_query.order_by(Client.created_at)
+        sort_keys = [(db.func.coalesce(Client.created_at, SORT_NULL_DATE), descending)]
+    elif sort_by == 'name':
+        sort_keys = [(Client.name, descending)]
     else:  # Default fallback
-        clients_query = clients_query.order_by(Client.name)
+        sort_keys = [(Client.name, False)]
+    sort_keys.append((Client.id, False))
     
     # Create pagination
-    from pagination import Pagination
-    count = clients_query.count()
-    clients = clients_query.offset((page - 1) * per_page).limit(per_page).all()
-    # Fix: Update pagination initialization to match expected parameters
-    pagination = Pagination(clients, page, per_page, 'clients', 
+    pagination = Pagination(clients_query, page, per_page, 'clients', keyset=sort_keys,
                            sort=sort_by, order=sort_order, search=search_term)
+    clients = pagination.items
+    
+    # Container counts for the page in one grouped query
+    counts = {}
+    if clients:
+        counts = dict(
+            db.session.query(Container.client_id, db.func.count(Container.id))
+            .filter(Container.client_id.in_([client.id for client in clients]))
+            .group_by(Container.client_id).all()
+        )
+    for client in clients:
+        client.container_count = counts.get(client.id, 0)
     
     return render_template('clients.html',
                         clients=clients,
@@ -4375,7 +5773,7 @@ def client_detail(id):
     client = Client.query.get_or_404(id)
     
     # Get containers associated with this client
-    containers = Container.query.filter_by(client_id=id).all()
+    containers = prefetch_container_state(Container.query.filter_by(client_id=id).all())
     
     return render_template('client_detail.html',
                          client=client,
@@ -0,0 +1,168 @@
+import logging
+
+from sqlalchemy import String, and_, func, or_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import StatementError
+
+logger = logging.getLogger(__name__)
+
+# Rows per executemany call; each call is sent as multi-row INSERT statements
+BULK_CHUNK_SIZE = 5000
+
+# Bound parameters per statement on SQLite builds older than 3.32
+SQLITE_MAX_VARIABLES = 999
+
+def _chunks(rows, size):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+def insert_rows(connection, table, rows, chunk_size=BULK_CHUNK_SIZE):
+    """Insert plain dict rows into a Core table without building ORM objects.
+
+    The driver's executemany is batched by SQLAlchemy into multi-row INSERTs
+    (insertmanyvalues), so thousands of rows go in per round trip. Every row
+    must have the same keys; columns left out get their model defaults.
+    Returns the number of rows inserted.
+    """
+    rows = list(rows)
+    for chunk in _chunks(rows, chunk_size):
+        connection.execute(table.insert(), chunk)
+    return len(rows)
+
+def insert_returning_ids(connection, table, rows, chunk_size=BULK_CHUNK_SIZE):
+    """Insert rows and return their new primary keys in the same order as `rows`.
+
+    Uses INSERT ... RETURNING batched with insertmanyvalues where the database
+    supports it (PostgreSQL, SQLite 3.35+). Older SQLite gets an id-range
+    fallback: each chunk is one multi-row INSERT, whose rowids SQLite assigns
+    consecutively, so the ids are the range ending at the cursor's lastrowid.
+    Anything else falls back to one INSERT per row.
+    """
+    rows = list(rows)
+    if not rows:
+        return []
+    pk = table.primary_key.columns.values()[0]
+    dialect = connection.dialect
+    ids = []
+
+    if dialect.insert_executemany_returning_sort_by_parameter_order:
+        statement = table.insert().returning(pk, sort_by_parameter_order=True)
+        for chunk in _chunks(rows, chunk_size):
+            ids.extend(connection.execute(statement, chunk).scalars().all())
+        return ids
+
+    if dialect.name == 'sqlite':
+        per_row = max(1, SQLITE_MAX_VARIABLES // max(1, len(rows[0])))
+        for chunk in _chunks(rows, min(chunk_size, per_row)):
+            result = connection.execute(table.insert().values(chunk))
+            last_id = result.lastrowid
+            ids.extend(range(last_id - len(chunk) + 1, last_id + 1))
+        return ids
+
+    logger.warning(f"{dialect.name} cannot return ids from a bulk insert, inserting {len(rows)} rows one by one")
+    for row in rows:
+        ids.append(connection.execute(table.insert(), row).inserted_primary_key[0])
+    return ids
+
+# Dialects with INSERT ... ON CONFLICT and their insert() constructs
+UPSERT_INSERTS = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+
+def upsert_rows(connection, table, rows, key_columns, update_columns, index_where=None,
+                chunk_size=BULK_CHUNK_SIZE):
+    """INSERT ... ON CONFLICT DO UPDATE on the unique key `key_columns`.
+
+    Rows whose key already exists get their `update_columns` overwritten,
+    except that None (or an empty string, in text columns) never replaces a
+    stored value; new rows are inserted as given. The conflict update only
+    fires when one of those columns actually changes, so upserting the same
+    rows again writes nothing. `index_where` is needed when the key is a
+    partial unique index. Rows are batched with insertmanyvalues like
+    insert_rows(). Returns (primary key, *key_columns) tuples for the rows
+    that were inserted or changed; unchanged rows are left out.
+    """
+    rows = list(rows)
+    if not rows:
+        return []
+    insert = UPSERT_INSERTS.get(connection.dialect.name)
+    if insert is None:
+        raise NotImplementedError(f"{connection.dialect.name} does not support INSERT ... ON CONFLICT")
+
+    pk = table.primary_key.columns.values()[0]
+    statement = insert(table)
+
+    def incoming(name):
+        # The row's value for an update, NULL when it is blank
+        value = statement.excluded[name]
+        return func.nullif(value, '') if isinstance(table.c[name].type, String) else value
+
+    statement = statement.on_conflict_do_update(
+        index_elements=[table.c[name] for name in key_columns],
+        index_where=index_where,
+        set_={name: func.coalesce(incoming(name), table.c[name]) for name in update_columns},
+        where=or_(*[and_(incoming(name).is_not(None), incoming(name).is_distinct_from(table.c[name]))
+                    for name in update_columns]),
+    ).returning(pk, *[table.c[name] for name in key_columns])
+
+    changed = []
+    for chunk in _chunks(rows, chunk_size):
+        changed.extend(tuple(row) for row in connection.execute(statement, chunk))
+    return changed
+
+def write_isolating_failures(rows, write, savepoint):
+    """Write rows in bulk with `write(rows)`, isolating the rows that make it fail.
+
+    Each attempt runs inside `savepoint()`, a context manager that rolls back
+    to a SAVEPOINT if the block raises (e.g. session.begin_nested). When a
+    write fails with a database error its rows are split in half and each
+    half is retried in its own savepoint, down to single rows. Clean data is
+    one write; a bad row costs about log2(len(rows)) extra attempts instead
+    of the whole batch. `write` must leave no other trace when it raises.
+    Returns (row, exception) pairs for the rows that failed on their own.
+    """
+    failed = []
+    pending = [list(rows)]
+    while pending:
+        chunk = pending.pop()
+        if not chunk:
+            continue
+        try:
+            with savepoint():
+                write(chunk)
+        except StatementError as e:
+            if len(chunk) == 1:
+                failed.append((chunk[0], e))
+            else:
+                # Second half goes on the stack first so rows are retried in order
+                middle = len(chunk) // 2
+                pending.append(chunk[middle:])
+                pending.append(chunk[:middle])
+    return failed
+
+class AdaptiveBatchSize:
+    """Rows per batch, adjusted to the time each batch actually takes.
+
+    Call it for the size of the next batch and record() each finished one.
+    The next size aims at `target_seconds` per batch at the rate just
+    observed, changes by at most 2x at a time and stays between `minimum`
+    and `maximum`. A batch that had failing rows halves the size, so dirty
+    data is written (and bisected) in smaller pieces.
+    """
+
+    def __init__(self, initial, minimum=100, maximum=20000, target_seconds=2.0):
+        self.minimum = minimum
+        self.maximum = max(maximum, minimum)
+        self.target_seconds = target_seconds
+        self.size = min(max(initial, self.minimum), self.maximum)
+
+    def __call__(self):
+        return self.size
+
+    def record(self, rows, seconds, failed=False):
+        if failed:
+            size = self.size / 2
+        elif rows and seconds > 0:
+            size = rows * self.target_seconds / seconds
+            size = min(max(size, self.size / 2), self.size * 2)
+        else:
+            return
+        self.size = int(min(max(size, self.minimum), self.maximum))
@@ -0,0 +1,643 @@
+"""Column-wise normalization of container import sheets.
+
+Everything here works on whole pandas columns and has no database access, so
+a sheet is cleaned in one pass before any rows are written. The app passes in
+what it needs (such as the location code map) so this module stays importable
+on its own.
+"""
+import difflib
+import io
+import os
+import zipfile
+from collections import namedtuple
+from datetime import datetime
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+# String date formats accepted in import sheets, tried in order
+IMPORT_DATE_FORMATS = ['%Y-%m-%d', '%d/%m/%Y', '%m/%d/%Y']
+
+# Day zero of Excel's serial date numbers
+EXCEL_EPOCH = pd.Timestamp(1899, 12, 30)
+
+# Columns that must be present in every import sheet
+REQUIRED_IMPORT_COLUMNS = ['container_number', 'container_type']
+
+# Columns that together carry an initial status for each row
+STATUS_COLUMNS = ['status', 'date', 'location']
+
+# File types the importer reads, on their own or inside a zip archive
+IMPORT_EXTENSIONS = ('.xlsx', '.xls', '.csv')
+
+class ImportFileError(Exception):
+    """Raised for import files that can't be processed at all, e.g. missing required columns"""
+
+def missing_import_columns(columns):
+    """Return the required columns that are missing from a sheet's header"""
+    return [col for col in REQUIRED_IMPORT_COLUMNS if col not in columns]
+
+def has_status_columns(columns):
+    """True if the sheet has every column needed to import an initial status"""
+    return all(col in columns for col in STATUS_COLUMNS)
+
+def clean_text(series):
+    """Stripped strings with blanks (NaN/None) turned into None"""
+    present = series.notna()
+    cleaned = series.where(present, '').astype(str).str.strip()
+    return cleaned.where(present, None).astype(object)
+
+def map_codes(series, codes):
+    """Replace values that are keys of `codes` with their mapped value"""
+    return series.where(~series.isin(list(codes)), series.map(codes))
+
+def parse_import_dates(series, formats=IMPORT_DATE_FORMATS):
+    """Parse a column of mixed date values into datetime64 (NaT where unparseable).
+
+    Handles datetime values, strings in any of `formats` (first match wins) and
+    Excel serial day numbers.
+    """
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series.dt.tz_localize(None) if getattr(series.dt, 'tz', None) else series
+
+    result = pd.Series(pd.NaT, index=series.index, dtype='datetime64[ns]')
+    if series.empty:
+        return result
+
+    # Datetime objects (including pandas Timestamps) are used as they are
+    is_datetime = series.map(lambda v: isinstance(v, datetime))
+    if is_datetime.any():
+        result[is_datetime] = pd.to_datetime(series[is_datetime], errors='coerce')
+
+    # Strings: try each format on whatever is still unparsed
+    is_string = series.map(lambda v: isinstance(v, str))
+    if is_string.any():
+        strings = series[is_string]
+        for fmt in formats:
+            pending = result[is_string].isna()
+            if not pending.any():
+                break
+            parsed = pd.to_datetime(strings[pending], format=fmt, errors='coerce')
+            result.loc[parsed.index] = result.loc[parsed.index].fillna(parsed)
+
+    # Numbers are Excel serial dates (whole days since 1899-12-30)
+    is_number = series.map(lambda v: isinstance(v, (int, float, np.integer, np.floating))
+                           and not isinstance(v, bool))
+    is_number &= series.notna()
+    if is_number.any():
+        days = np.trunc(series[is_number].astype(float))
+        result[is_number] = EXCEL_EPOCH + pd.to_timedelta(days, unit='D')
+
+    return result
+
+def split_vessel_info(series):
+    """Split "VESSEL NAME V1234" values into vessel_name / voyage_number columns.
+
+    Values without " V" are taken as a bare vessel name with no voyage number.
+    """
+    info = clean_text(series)
+    parts = info.fillna('').str.partition(' V')
+    has_voyage = parts[1] == ' V'
+    vessel_name = parts[0].str.strip().where(info.notna(), None)
+    voyage_number = ('V' + parts[2].str.strip()).where(has_voyage & info.notna(), None)
+    return pd.DataFrame({
+        'vessel_info': info,
+        'vessel_name': vessel_name.where(has_voyage, info).astype(object),
+        'voyage_number': voyage_number.astype(object),
+    }, index=series.index)
+
+def _column(df, name, default=np.nan):
+    """A column from the sheet, or a column of `default` if the sheet doesn't have it"""
+    if name in df.columns:
+        return df[name]
+    return pd.Series(default, index=df.index, dtype=object)
+
+def _datetimes_or_none(series):
+    """datetime64 column as Python datetimes, with None for NaT"""
+    values = pd.Series(series.array.to_pydatetime(), index=series.index, dtype=object)
+    return values.where(series.notna(), None)
+
+def normalize_import_frame(df, location_codes, now=None):
+    """Normalize an import sheet column by column.
+
+    Returns a DataFrame with one row per usable sheet row (blank container
+    number/type rows are dropped) and the columns: row_number (1-based data row
+    in the sheet), container_number, container_type, bl_number, loading_port,
+    final_destination, opr, arrival_date, stripping_date, client_name,
+    has_status, status, status_date, status_location, notes, vessel_info,
+    vessel_name and voyage_number. Missing values are None.
+    """
+    now = now or datetime.utcnow()
+    out = pd.DataFrame(index=df.index)
+    # CSV chunks and sliced sheets keep their position in the index
+    if pd.api.types.is_integer_dtype(df.index):
+        out['row_number'] = df.index.to_numpy() + 1
+    else:
+        out['row_number'] = np.arange(1, len(df) + 1)
+
+    out['container_number'] = clean_text(_column(df, 'container_number'))
+    out['container_type'] = clean_text(_column(df, 'container_type'))
+    out['bl_number'] = clean_text(_column(df, 'bl_number'))
+    out['opr'] = clean_text(_column(df, 'opr', ''))
+    for name in ['loading_port', 'final_destination']:
+        out[name] = map_codes(clean_text(_column(df, name, '')), location_codes)
+
+    out['arrival_date'] = _datetimes_or_none(parse_import_dates(_column(df, 'arrival_date')))
+    out['stripping_date'] = _datetimes_or_none(parse_import_dates(_column(df, 'stripping_date')))
+
+    # Client column is matched case-insensitively
+    client_column = next((col for col in df.columns if str(col).lower() == 'client'), None)
+    client_name = clean_text(_column(df, client_column)) if client_column else pd.Series(None, index=df.index, dtype=object)
+    out['client_name'] = client_name.where(client_name != '', None)
+
+    # Initial status: only when the sheet has status/date/location and the row fills all three
+    if has_status_columns(df.columns):
+        has_status = df['status'].notna() & df['date'].notna() & df['location'].notna()
+    else:
+        has_status = pd.Series(False, index=df.index)
+    out['has_status'] = has_status
+    out['status'] = clean_text(_column(df, 'status')).str.lower().where(has_status, None)
+    status_date = parse_import_dates(_column(df, 'date')).fillna(pd.Timestamp(now))
+    out['status_date'] = _datetimes_or_none(status_date.where(has_status))
+    out['status_location'] = map_codes(clean_text(_column(df, 'location')), location_codes).where(has_status, None)
+    out['notes'] = clean_text(_column(df, 'notes', ''))
+
+    out = out.join(split_vessel_info(_column(df, 'vessel')))
+
+    # Skip empty rows
+    usable = out['container_number'].fillna('').ne('') & out['container_type'].fillna('').ne('')
+    return out[usable]
+
+def import_records(normalized):
+    """Normalized rows as plain dicts (None for missing values) ready for the database"""
+    columns = list(normalized.columns)
+    values = []
+    for name in columns:
+        column = normalized[name]
+        if column.dtype == object:
+            values.append([None if value is None or value != value else value for value in column.tolist()])
+        else:
+            values.append(column.tolist())
+    return [dict(zip(columns, row)) for row in zip(*values)]
+
+class ExcelSheetReader:
+    """Stream one sheet of an .xlsx workbook as DataFrame chunks.
+
+    Uses openpyxl's read-only mode, so only the current chunk of rows is held
+    in memory however large the sheet is. The first `skip_rows` rows (titles,
+    logos, notes above the table) are skipped and the next row is the header.
+    Use as a context manager so the workbook file gets closed.
+    """
+
+    def __init__(self, path, sheet_name=None, skip_rows=0):
+        self.workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+        try:
+            if sheet_name:
+                if sheet_name not in self.workbook.sheetnames:
+                    raise ImportFileError(f"Sheet '{sheet_name}' not found. Available sheets: "
+                                          f"{', '.join(self.workbook.sheetnames)}")
+                self.sheet = self.workbook[sheet_name]
+            else:
+                self.sheet = self.workbook.worksheets[0]
+
+            # The stored dimensions give a total for progress, but some writers get them
+            # wrong, so they are reset before reading to make sure no rows are cut off
+            max_row = self.sheet.max_row
+            self.total_rows = max(max_row - skip_rows - 1, 0) if max_row else None
+            self.sheet.reset_dimensions()
+
+            self._rows = self.sheet.iter_rows(min_row=skip_rows + 1, values_only=True)
+            self.row_count = 0  # Row positions read so far, blank rows included
+            header = next(self._rows, None)
+            if header is None:
+                raise ImportFileError('The sheet has no header row')
+            self.columns = [f'Unnamed: {i}' if value is None else str(value) for i, value in enumerate(header)]
+        except Exception:
+            self.close()
+            raise
+
+    def chunks(self, chunk_size, start_row=0):
+        """Yield DataFrames of up to `chunk_size` rows, starting `start_row` rows after the header.
+
+        The index is each row's position below the header (0-based), so it
+        matches what pd.read_excel() would give. Completely empty rows are left
+        out; their positions are simply skipped. `chunk_size` may also be a
+        callable, asked again for the size of every chunk.
+        """
+        size = chunk_size if callable(chunk_size) else lambda: chunk_size
+        width = len(self.columns)
+        rows, index = [], []
+        limit = size()
+        for position, values in enumerate(self._rows):
+            self.row_count = position + 1
+            if position < start_row:
+                continue
+            if all(value is None for value in values):
+                continue
+            values = tuple(values[:width])
+            if len(values) < width:
+                values += (None,) * (width - len(values))
+            rows.append(values)
+            index.append(position)
+            if len(rows) >= limit:
+                yield pd.DataFrame(rows, columns=self.columns, index=index)
+                rows, index = [], []
+                limit = size()
+        if rows:
+            yield pd.DataFrame(rows, columns=self.columns, index=index)
+
+    def close(self):
+        self.workbook.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+# One file, or one sheet of a workbook, within an upload. `member` is the
+# file's name inside a zip archive at `path`.
+ImportSource = namedtuple('ImportSource', 'path filename member sheet_name label')
+
+def _source_data(source):
+    """Path or file object to read a source's file from"""
+    if source.member is None:
+        return source.path
+    with zipfile.ZipFile(source.path) as archive:
+        return io.BytesIO(archive.read(source.member))
+
+def _sheet_names(data, filename):
+    if filename.endswith('.xlsx'):
+        workbook = openpyxl.load_workbook(data, read_only=True)
+        try:
+            return workbook.sheetnames
+        finally:
+            workbook.close()
+    return pd.ExcelFile(data).sheet_names
+
+def list_import_sources(path, filename, sheet_name=None, all_sheets=False):
+    """The files and sheets an upload is made of, in the order they are imported.
+
+    A zip archive contributes every .xlsx/.xls/.csv file in it, by name.
+    With `all_sheets` each workbook contributes every sheet; otherwise
+    `sheet_name` (default: the first sheet) is used for every workbook.
+    """
+    filename = filename.lower()
+    if filename.endswith('.zip'):
+        with zipfile.ZipFile(path) as archive:
+            members = sorted(name for name in archive.namelist()
+                             if name.lower().endswith(IMPORT_EXTENSIONS) and not name.startswith('__MACOSX/'))
+        if not members:
+            raise ImportFileError('The zip file contains no .xlsx, .xls or .csv files')
+        files = [(member, member.lower(), member) for member in members]
+    else:
+        files = [(None, filename, os.path.basename(filename))]
+
+    sources = []
+    for member, name, label in files:
+        if not name.endswith('.csv') and all_sheets:
+            sheets = _sheet_names(_source_data(ImportSource(path, name, member, None, label)), name)
+            sources.extend(ImportSource(path, name, member, sheet, f'{label} / {sheet}') for sheet in sheets)
+        else:
+            sheet = None if name.endswith('.csv') else sheet_name
+            sources.append(ImportSource(path, name, member, sheet, f'{label} / {sheet}' if sheet else label))
+    return sources
+
+def _source_chunks(source, chunk_size, skip_rows=0):
+    """Open a source as (header columns, estimated rows, iterator of DataFrame chunks, row count so far, reader).
+
+    Chunks are indexed by row position below the header. The row count is a
+    callable, final once the chunks are used up; the estimate is None when
+    it isn't known up front. `reader` needs closing when it isn't None.
+    """
+    data = _source_data(source)
+    if source.filename.endswith('.csv'):
+        columns = list(pd.read_csv(data, nrows=0, skiprows=skip_rows).columns)
+        if hasattr(data, 'seek'):
+            data.seek(0)
+        frames = pd.read_csv(data, skiprows=skip_rows, chunksize=chunk_size)
+        counted = [0]
+
+        def chunks():
+            with frames:
+                for frame in frames:
+                    counted[0] += len(frame)
+                    yield frame
+        return columns, None, chunks(), lambda: counted[0], None
+
+    if source.filename.endswith('.xlsx'):
+        reader = ExcelSheetReader(data, source.sheet_name, skip_rows)
+        return reader.columns, reader.total_rows, reader.chunks(chunk_size), lambda: reader.row_count, reader
+
+    # Old .xls workbooks can't be streamed; the sheet is read whole and split up
+    frame = pd.read_excel(data, sheet_name=source.sheet_name or 0, skiprows=skip_rows)
+    chunks = (frame.iloc[start:start + chunk_size] for start in range(0, len(frame), chunk_size))
+    return list(frame.columns), len(frame), chunks, lambda: len(frame), None
+
+def iter_import_source(source, location_codes, chunk_size, skip_rows=0, now=None):
+    """Read and normalize one source a chunk at a time, so only one chunk of `chunk_size` rows is in memory.
+
+    Yields ('columns', header columns, estimated rows or None) once the
+    header checks out, then ('chunk', raw rows, normalized rows) for every
+    chunk, and always ends with ('end', result): a dict with the source's
+    label, columns, row_count (row positions below the header, blank rows
+    included) and an error message when the source can't be imported, or
+    stopped being readable part way through.
+    """
+    result = {'label': source.label, 'columns': [], 'row_count': 0, 'error': None}
+    reader = None
+    row_count = None
+    try:
+        columns, estimate, chunks, row_count, reader = _source_chunks(source, chunk_size, skip_rows)
+        result['columns'] = columns
+        missing_columns = missing_import_columns(columns)
+        if missing_columns:
+            result['error'] = f"missing required columns: {', '.join(missing_columns)}"
+        else:
+            yield 'columns', columns, estimate
+            for frame in chunks:
+                yield 'chunk', frame, normalize_import_frame(frame, location_codes, now)
+            result['row_count'] = row_count()
+    except (ImportFileError, ValueError, KeyError, zipfile.BadZipFile) as e:
+        result['error'] = str(e)
+        if row_count is not None and row_count():
+            # Chunks before the error were handed on already
+            result['row_count'] = row_count()
+            result['error'] += f' (stopped after {row_count()} rows)'
+    finally:
+        if reader is not None:
+            reader.close()
+    yield 'end', result
+
+# Queues the parsing processes hand chunks back through, one per source being read
+_source_queues = None
+
+def init_import_source_worker(queues):
+    """Process pool initializer: keep the chunk queues, which can only be passed when a process starts"""
+    global _source_queues
+    _source_queues = queues
+
+def stream_import_source(slot, source, location_codes, chunk_size, skip_rows=0, now=None):
+    """Worker process task: put iter_import_source()'s items on queue `slot` and return its result.
+
+    The queues are bounded, so a worker that gets ahead of the writer waits
+    instead of piling up chunks.
+    """
+    for item in iter_import_source(source, location_codes, chunk_size, skip_rows, now):
+        _source_queues[slot].put(item)
+    return item[1]
+
+def _fold(value):
+    """Case-insensitive lookup key for names and voyage numbers"""
+    return value.strip().casefold() if value else ''
+
+class ImportLookups:
+    """In-memory lookups for one import, loaded once instead of querying per row.
+
+    Built from plain (column, ...) tuples so the app decides how they are
+    queried. The maps are kept up to date as rows are added, so duplicates
+    inside the same file are caught too.
+    """
+
+    def __init__(self, containers=(), clients=(), vessels=()):
+        # containers: (container_number, bl_number)
+        self.container_numbers = set()
+        self.container_bls = set()
+        for number, bl_number in containers:
+            self.add_container(number, bl_number)
+
+        # clients: (id, name); the first client with a name wins, like .first() did
+        self.client_ids = {}
+        self.client_names = {}
+        for client_id, name in clients:
+            self.add_client(client_id, name)
+
+        # vessels: (id, name, voyage_number) -> (id, name)
+        self.vessels_by_voyage = {}
+        self.vessels_by_name = {}
+        for vessel_id, name, voyage_number in vessels:
+            self.vessels_by_voyage.setdefault((_fold(name), _fold(voyage_number)), (vessel_id, name))
+            self.vessels_by_name.setdefault(_fold(name), (vessel_id, name))
+
+    def duplicate_reason(self, container_number, bl_number):
+        """Why a row would duplicate an existing container, or None if it can be added.
+
+        A container number may be imported again only with a new BL number.
+        """
+        if container_number not in self.container_numbers:
+            return None
+        if not bl_number:
+            return 'already exists and no new BL number provided'
+        if (container_number, bl_number) in self.container_bls:
+            return f'already exists with same BL number {bl_number}'
+        return None
+
+    def add_container(self, container_number, bl_number):
+        self.container_numbers.add(container_number)
+        if bl_number:
+            self.container_bls.add((container_number, bl_number))
+
+    def client_id(self, name):
+        return self.client_ids.get(_fold(name))
+
+    def missing_clients(self, names):
+        """Distinct client names (first spelling seen) that have no client yet"""
+        missing = {}
+        for name in names:
+            if name and _fold(name) not in self.client_ids:
+                missing.setdefault(_fold(name), name)
+        return list(missing.values())
+
+    def add_client(self, client_id, name):
+        self.client_ids.setdefault(_fold(name), client_id)
+        self.client_names.setdefault(_fold(name), name)
+
+    def vessel(self, name, voyage_number=None):
+        """(id, name) of the vessel for a name and voyage, falling back to the name alone"""
+        if not name:
+            return None
+        if voyage_number:
+            match = self.vessels_by_voyage.get((_fold(name), _fold(voyage_number)))
+            if match:
+                return match
+        return self.vessels_by_name.get(_fold(name))
+
+# Columns of the dry-run report, in order
+REPORT_COLUMNS = ['source', 'row', 'container_number', 'column', 'severity', 'problem', 'suggestion']
+
+DATE_FORMAT_HINT = 'Use YYYY-MM-DD (e.g. 2024-03-15), DD/MM/YYYY or MM/DD/YYYY, or an Excel date cell'
+
+def _close_match(value, names):
+    """The closest of `names` to `value` (compared case-insensitively), or None"""
+    by_fold = {_fold(name): name for name in names if name}
+    matches = difflib.get_close_matches(_fold(value), list(by_fold), n=1, cutoff=0.8)
+    return by_fold[matches[0]] if matches else None
+
+def _filled(series):
+    """True where a raw sheet value is present and not just whitespace"""
+    return series.notna() & series.astype(str).str.strip().ne('')
+
+class ImportValidator:
+    """Dry run of an import: reports what would happen to each row without writing anything.
+
+    Each batch goes through the same normalization and lookups as a real
+    import, and every problem found becomes a report row (see REPORT_COLUMNS)
+    with a severity: 'error' means the row would not be imported, 'warning'
+    that it would be imported with something left out or defaulted, and
+    'info' that something would be created or matched loosely. `lookups` is
+    updated as if the accepted rows had been imported, so duplicates further
+    down the file are reported too. `first_data_row` is the sheet row number
+    of the first row below the header, so report rows match what the
+    operator sees in Excel. With `upsert`, rows matching an existing
+    container number and BL count as updates instead of duplicates.
+    """
+
+    def __init__(self, lookups, columns, valid_statuses, first_data_row=2, upsert=False):
+        self.lookups = lookups
+        self.upsert = upsert
+        self.columns = list(columns)
+        self.valid_statuses = list(valid_statuses)
+        self.first_data_row = first_data_row
+        self.has_status = has_status_columns(self.columns)
+        self.new_clients = set()
+
+    def header_problems(self):
+        """Problems with the sheet as a whole, reported once before the rows"""
+        present = [col for col in STATUS_COLUMNS if col in self.columns]
+        if not present or self.has_status:
+            return []
+        missing = [col for col in STATUS_COLUMNS if col not in self.columns]
+        return [{
+            'source': None, 'row': None, 'container_number': None, 'column': ', '.join(missing), 'severity': 'warning',
+            'problem': f"No statuses will be imported: the sheet has {', '.join(present)} "
+                       f"but no {', '.join(missing)} column",
+            'suggestion': 'Add the missing columns; status, date and location are imported together',
+        }]
+
+    def start_source(self, columns, source=None):
+        """Switch to the next file/sheet of a multi-file upload; returns its header problems"""
+        self.columns = list(columns)
+        self.has_status = has_status_columns(self.columns)
+        return [dict(problem, source=source) for problem in self.header_problems()]
+
+    def check_batch(self, batch_df, normalized, stats, source=None):
+        """Check one batch and return its report rows, ordered by sheet row.
+
+        `normalized` is normalize_import_frame() of `batch_df`. Counts go into
+        `stats` under the keys a real import uses (rows_inserted,
+        rows_updated and rows_skipped read as would-be-imported/updated/
+        rejected) plus error_count and warning_count. `source` labels the
+        file/sheet the batch came from.
+        """
+        problems = []
+        rejected = set()
+        updates = 0
+        numbers = clean_text(_column(batch_df, 'container_number')).to_dict()
+        in_use = batch_df.notna().any(axis=1)
+
+        def report(position, column, severity, problem, suggestion):
+            problems.append({
+                'source': source,
+                'row': int(position) + self.first_data_row,
+                'container_number': numbers.get(position),
+                'column': column, 'severity': severity, 'problem': problem, 'suggestion': suggestion,
+            })
+            if severity == 'error':
+                rejected.add(position)
+
+        # Rows the importer drops for a missing container number or type
+        for name, label in [('container_number', 'Container number'), ('container_type', 'Container type')]:
+            blank = in_use & ~_filled(_column(batch_df, name))
+            for position in batch_df.index[blank]:
+                report(position, name, 'error', f'{label} is missing',
+                       f'Fill in the {label.lower()} or delete the row')
+
+        # Dates that are filled in but can't be read
+        date_effects = {
+            'arrival_date': 'the arrival date will be left empty',
+            'stripping_date': 'the stripping date will be left empty',
+            'date': 'the status date will be set to the time of the import',
+        }
+        for name, effect in date_effects.items():
+            if name not in batch_df.columns or (name == 'date' and not self.has_status):
+                continue
+            raw = batch_df[name]
+            unreadable = _filled(raw) & parse_import_dates(raw).isna()
+            for position in batch_df.index[unreadable]:
+                report(position, name, 'warning', f"Can't read date '{raw[position]}', {effect}", DATE_FORMAT_HINT)
+
+        if self.has_status:
+            # Status needs all three of status, date and location
+            filled = pd.DataFrame({col: batch_df[col].notna() for col in STATUS_COLUMNS})
+            partial = in_use & filled.any(axis=1) & ~filled.all(axis=1)
+            for position in batch_df.index[partial]:
+                missing = [col for col in STATUS_COLUMNS if not filled.at[position, col]]
+                report(position, missing[0], 'warning',
+                       'Status not imported: status, date and location must all be filled in',
+                       f"Fill in {' and '.join(missing)}, or clear the other status columns")
+
+        # Duplicates, statuses, clients and vessels, row by row in file order
+        for position, row in zip(normalized.index, import_records(normalized)):
+            if self._check_row(position, row, report, stats):
+                updates += 1
+            elif position not in rejected:
+                self.lookups.add_container(row['container_number'], row['bl_number'])
+
+        accepted = len(normalized) - len(rejected.intersection(normalized.index))
+        stats['rows_inserted'] += accepted - updates
+        stats['rows_updated'] += updates
+        stats['rows_skipped'] += int(in_use.sum()) - accepted
+        stats['error_count'] += sum(1 for p in problems if p['severity'] == 'error')
+        stats['warning_count'] += sum(1 for p in problems if p['severity'] == 'warning')
+        return sorted(problems, key=lambda p: p['row'])
+
+    def _check_row(self, position, row, report, stats):
+        """Report the problems of one usable row; True if it would update an existing container"""
+        container_number = row['container_number']
+        bl_number = row['bl_number']
+        updates = bool(self.upsert and bl_number and (container_number, bl_number) in self.lookups.container_bls)
+        if updates:
+            report(position, 'bl_number', 'info',
+                   f'Container {container_number} with BL {bl_number} exists and will be updated where fields changed',
+                   'No change needed; status and vessel are only imported for new containers')
+        skip_reason = None if updates else self.lookups.duplicate_reason(container_number, bl_number)
+        if skip_reason:
+            report(position, 'bl_number', 'error', f'Container {container_number} {skip_reason}',
+                   'Remove the row, or enter the BL number of the new shipment' if bl_number
+                   else 'Enter the BL number of the new shipment, or remove the row')
+            return
+
+        if not updates and row['has_status'] and row['status'] not in self.valid_statuses:
+            suggestion = _close_match(row['status'], self.valid_statuses)
+            report(position, 'status', 'warning', f"Unknown status '{row['status']}'",
+                   f"Did you mean '{suggestion}'?" if suggestion
+                   else f"Use one of: {', '.join(self.valid_statuses)}")
+
+        client_name = row['client_name']
+        if client_name and self.lookups.client_id(client_name) is None and _fold(client_name) not in self.new_clients:
+            self.new_clients.add(_fold(client_name))
+            stats['clients_created'] += 1
+            suggestion = _close_match(client_name, self.lookups.client_names.values())
+            report(position, 'client', 'info', f"New client '{client_name}' will be created",
+                   f"Did you mean existing client '{suggestion}'?" if suggestion
+                   else 'No change needed if this is a new client')
+
+        if updates or row['vessel_info'] is None:
+            return updates
+        if not (row['has_status'] and row['status'] == 'loaded'):
+            report(position, 'vessel', 'info', 'Vessel is only used for rows with status loaded',
+                   'No change needed, or set status, date and location to record the load')
+            return
+        vessel = self.lookups.vessel(row['vessel_name'], row['voyage_number'])
+        if not vessel:
+            stats['vessels_not_found'].add(row['vessel_info'])
+            suggestion = _close_match(row['vessel_name'], [name for _, name in self.lookups.vessels_by_name.values()])
+            report(position, 'vessel', 'warning',
+                   f"Vessel '{row['vessel_info']}' not found, no load movement will be created",
+                   f"Did you mean vessel '{suggestion}'?" if suggestion else 'Add the vessel before importing')
+        elif row['voyage_number'] and (_fold(row['vessel_name']), _fold(row['voyage_number'])) \
+                not in self.lookups.vessels_by_voyage:
+            report(position, 'vessel', 'info',
+                   f"Voyage {row['voyage_number']} not found, the load is recorded on vessel {vessel[1]}",
+                   'Check the voyage number')
@@ -0,0 +1,40 @@
+from app import app, db, Container, ContainerStatus, ContainerMovement, Vessel, ContainerCurrentState
+from sqlalchemy import text
+
+# Models whose __table_args__ define the hot-path index set
+INDEXED_MODELS = [Container, ContainerStatus, ContainerMovement, Vessel, ContainerCurrentState]
+
+def add_indexes():
+    """Create any missing indexes from the model definitions (SQLite and PostgreSQL)"""
+    with app.app_context():
+        try:
+            engine = db.engine
+            created = []
+            for model in INDEXED_MODELS:
+                table = model.__table__
+                table.create(engine, checkfirst=True)
+                existing = {index['name'] for index in db.inspect(engine).get_indexes(table.name)}
+                for index in sorted(table.indexes, key=lambda i: i.name):
+                    if index.name in existing:
+                        print(f"Index {index.name} already exists, skipping.")
+                        continue
+                    print(f"Creating index {index.name} on {table.name}...")
+                    index.create(engine)
+                    created.append(index.name)
+
+            # Refresh planner statistics so the new indexes get used straight away
+            with engine.begin() as connection:
+                if engine.dialect.name == 'postgresql':
+                    for model in INDEXED_MODELS:
+                        connection.execute(text(f'ANALYZE {model.__table__.name}'))
+                else:
+                    connection.execute(text('ANALYZE'))
+
+            print(f"Migration completed successfully! Created {len(created)} indexes.")
+            return True
+        except Exception as e:
+            print(f"Error during migration: {str(e)}")
+            return False
+
+if __name__ == '__main__':
+    add_indexes()
@@ -1,46 +1,239 @@
-from flask import request, url_for
+import base64
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+
+from flask import has_request_context, request, url_for
+from sqlalchemy import and_, or_
+
+# Cached totals for count='cached', keyed by endpoint and filter arguments. The
+# filters include free-text searches, so only the most recently used are kept
+COUNT_CACHE_SIZE = 256
+_count_cache = OrderedDict()
+_count_cache_lock = threading.Lock()
+
+# Arguments that change which page is shown but not how many rows match
+_NON_FILTER_ARGS = ('page', 'cursor', 'sort', 'order')
+
+def _encode_value(value):
+    """Make a sort key value JSON-safe for a cursor token"""
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    if isinstance(value, date):
+        return {'d': value.isoformat()}
+    return value
+
+def _decode_value(value):
+    """Reverse _encode_value"""
+    if isinstance(value, dict):
+        if 'dt' in value:
+            return datetime.fromisoformat(value['dt'])
+        if 'd' in value:
+            return date.fromisoformat(value['d'])
+    return value
+
+def clear_count_cache():
+    """Forget every cached total, e.g. after containers were added or changed.
+
+    Only this process's totals are cleared; other processes still let theirs
+    expire after count_ttl.
+    """
+    with _count_cache_lock:
+        _count_cache.clear()
+
+def _cached_count(key, query, ttl):
+    """A count from the cache if it hasn't expired, else a fresh one that is cached"""
+    now = time.monotonic()
+    with _count_cache_lock:
+        cached = _count_cache.get(key)
+        if cached and cached[1] > now:
+            _count_cache.move_to_end(key)
+            return cached[0]
+        _count_cache.pop(key, None)
+
+    total = query.count()
+    with _count_cache_lock:
+        # Drop expired totals, then the least recently used ones over the limit
+        for expired in [k for k, (_, expires) in _count_cache.items() if expires <= now]:
+            del _count_cache[expired]
+        _count_cache[key] = (total, now + ttl)
+        while len(_count_cache) > COUNT_CACHE_SIZE:
+            _count_cache.popitem(last=False)
+    return total
+
+def encode_cursor(values, direction, page):
+    """Build an opaque cursor token from the sort key values of a boundary row"""
+    payload = {'v': [_encode_value(v) for v in values], 'dir': direction, 'p': page}
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(token):
+    """Parse a cursor token, returning None if it is missing or malformed"""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        payload = json.loads(raw.decode('utf-8'))
+        return {
+            'values': [_decode_value(v) for v in payload['v']],
+            'direction': 'prev' if payload.get('dir') == 'prev' else 'next',
+            'page': max(int(payload.get('p', 1)), 1),
+        }
+    except (ValueError, KeyError, TypeError):
+        return None
+
+def keyset_order_by(keys, reverse=False):
+    """ORDER BY clauses for a list of (expression, descending) sort keys"""
+    clauses = []
+    for expression, descending in keys:
+        if reverse:
+            descending = not descending
+        clauses.append(expression.desc() if descending else expression.asc())
+    return clauses
+
+def keyset_after(keys, values, reverse=False):
+    """WHERE clause selecting rows strictly after the given key values.
+
+    Expanded as (k1 > v1) OR (k1 = v1 AND k2 > v2) OR ... so that keys can mix
+    ascending and descending directions. Key expressions must not be NULL.
+    """
+    clauses = []
+    for i, ((expression, descending), value) in enumerate(zip(keys, values)):
+        if reverse:
+            descending = not descending
+        step = expression < value if descending else expression > value
+        equal = [keys[j][0] == values[j] for j in range(i)]
+        clauses.append(and_(*equal, step) if equal else step)
+    return or_(*clauses)
 
 class Pagination:
-    def __init__(self, query, page=1, per_page=25, endpoint=None, **kwargs):
+    """Paginate a SQLAlchemy query or a Python list.
+
+    By default pages are fetched with LIMIT/OFFSET and the total comes from
+    query.count(). Passing keyset=[(expression, descending), ...] switches to
+    keyset (seek) pagination: the query is ordered by those keys, and the
+    previous/next links carry an opaque cursor holding the boundary row's key
+    values, so moving between neighbouring pages costs the same at any depth.
+    The last key must be unique (normally the primary key). Jumping straight
+    to a numbered page still falls back to OFFSET.
+
+    count controls the total: 'exact' runs query.count(), 'cached' reuses a
+    count for count_ttl seconds per endpoint and filter arguments, and None
+    skips it (pages is then only known up to the next page).
+    """
+    def __init__(self, query, page=1, per_page=25, endpoint=None, keyset=None,
+                 count='exact', count_ttl=60, **kwargs):
         self.query = query
         self.page = page
         self.per_page = per_page
         self.endpoint = endpoint
         self.kwargs = kwargs
-        
+        self.keyset = keyset
+        self.next_cursor = None
+        self.prev_cursor = None
+        self._keyset_has_next = None
+
         # Apply pagination to query or list
         if hasattr(query, 'limit'):
             # SQLAlchemy query
-            self.total = query.count()
-            self.items = query.limit(per_page).offset((page - 1) * per_page).all()
+            self.total = self._count(query, count, count_ttl)
+            if keyset:
+                self.items = self._fetch_keyset(query)
+            else:
+                self.items = query.limit(per_page).offset((page - 1) * per_page).all()
         else:
             # Python list
             self.total = len(query)
             self.items = query[(page - 1) * per_page:page * per_page]
-        
+
         # Calculate other pagination metadata
-        self.pages = (self.total - 1) // self.per_page + 1 if self.total > 0 else 1
-    
+        if self.total is not None:
+            self.pages = (self.total - 1) // self.per_page + 1 if self.total > 0 else 1
+        else:
+            self.pages = self.page
+        if self.keyset and self.next_cursor:
+            # Rows may have been added since the count was taken
+            self.pages = max(self.pages, self.page + 1)
+
+    def _count(self, query, count, count_ttl):
+        """Total number of rows according to the requested count mode"""
+        if count is None:
+            return None
+        if count == 'cached':
+            filters = tuple(sorted((k, str(v)) for k, v in self.kwargs.items() if k not in _NON_FILTER_ARGS))
+            return _cached_count((self.endpoint, filters), query, count_ttl)
+        return query.count()
+
+    def _fetch_keyset(self, query):
+        """Fetch one page by seeking past a cursor (or by offset when there is none)"""
+        keys = self.keyset
+        cursor = decode_cursor(request.args.get('cursor')) if has_request_context() else None
+        if cursor and len(cursor['values']) != len(keys):
+            cursor = None
+
+        # Select the key values alongside each row so the page boundaries can be encoded
+        keyed = query.order_by(None).add_columns(*[expression for expression, _ in keys])
+        backwards = cursor is not None and cursor['direction'] == 'prev'
+        if cursor:
+            self.page = cursor['page']
+            keyed = keyed.filter(keyset_after(keys, cursor['values'], reverse=backwards))
+            keyed = keyed.order_by(*keyset_order_by(keys, reverse=backwards))
+            rows = keyed.limit(self.per_page + 1).all()
+        else:
+            keyed = keyed.order_by(*keyset_order_by(keys))
+            rows = keyed.limit(self.per_page + 1).offset((self.page - 1) * self.per_page).all()
+
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+            has_next = True
+            has_prev = more
+            if not more:
+                # Walked back to the very first row
+                self.page = 1
+        else:
+            has_next = more
+            has_prev = self.page > 1
+
+        if rows and has_next:
+            self.next_cursor = encode_cursor(list(rows[-1][1:]), 'next', self.page + 1)
+        if rows and has_prev:
+            self.prev_cursor = encode_cursor(list(rows[0][1:]), 'prev', self.page - 1)
+        self._keyset_has_next = has_next
+        return [row[0] for row in rows]
+
     @property
     def has_prev(self):
         return self.page > 1
-    
+
     @property
     def has_next(self):
+        if self._keyset_has_next is not None:
+            return self._keyset_has_next
         return self.page < self.pages
-    
+
     @property
     def prev_page(self):
         return self.page - 1
-    
+
     @property
     def next_page(self):
         return self.page + 1
-    
+
     def get_url(self, page):
         """Generate URL for a page"""
+        args = dict(self.kwargs)
+        args['page'] = page
+        # Neighbouring pages are reached through the keyset cursors
+        if page == self.page + 1 and self.next_cursor:
+            args['cursor'] = self.next_cursor
+        elif page == self.page - 1 and page > 1 and self.prev_cursor:
+            args['cursor'] = self.prev_cursor
         if self.endpoint:
-            args = dict(self.kwargs)
-            args['page'] = page
             return url_for(self.endpoint, **args)
+        if 'cursor' in args:
+            return f"?page={page}&cursor={args['cursor']}"
         return f"?page={page}"
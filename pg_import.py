@@ -0,0 +1,195 @@
+import io
+
+from sqlalchemy import column, table, text
+
+# Normalized import columns (see container_import.normalize_import_frame) and their staging types
+STAGING_COLUMNS = [
+    ('row_number', 'integer'),
+    ('container_number', 'text'),
+    ('container_type', 'text'),
+    ('bl_number', 'text'),
+    ('opr', 'text'),
+    ('loading_port', 'text'),
+    ('final_destination', 'text'),
+    ('arrival_date', 'timestamp'),
+    ('stripping_date', 'timestamp'),
+    ('client_name', 'text'),
+    ('has_status', 'boolean'),
+    ('status', 'text'),
+    ('status_date', 'timestamp'),
+    ('status_location', 'text'),
+    ('notes', 'text'),
+    ('vessel_info', 'text'),
+    ('vessel_name', 'text'),
+    ('voyage_number', 'text'),
+]
+
+STAGING_TABLE = 'import_staging'
+
+# Marks the staging rows to import. Existing containers are narrowed down to the
+# numbers in the batch once, and the NOT IN checks against them run as hashed
+# subplans instead of a lookup per staged row.
+DEDUPE_SQL = f"""
+    WITH existing AS (
+        SELECT c.container_number, c.bl_number
+        FROM container c
+        WHERE c.container_number IN (SELECT container_number FROM {STAGING_TABLE})
+    ),
+    ranked AS (
+        SELECT row_number, container_number, bl_number,
+               ROW_NUMBER() OVER (PARTITION BY container_number ORDER BY row_number) AS nth_number,
+               ROW_NUMBER() OVER (PARTITION BY container_number, bl_number ORDER BY row_number) AS nth_pair
+        FROM {STAGING_TABLE}
+    )
+    UPDATE {STAGING_TABLE}
+    SET accepted = true
+    FROM ranked r
+    WHERE r.row_number = {STAGING_TABLE}.row_number
+      AND (
+          (r.nth_number = 1
+           AND r.container_number NOT IN (SELECT container_number FROM existing))
+          OR (r.bl_number IS NOT NULL AND r.nth_pair = 1
+              AND (r.container_number, r.bl_number) NOT IN (
+                  SELECT container_number, bl_number FROM existing WHERE bl_number IS NOT NULL))
+      )
+"""
+
+# Staging rows the batch actually imports, for refreshing their container state afterwards
+staged_container_ids = table(STAGING_TABLE, column('container_id'), column('accepted'))
+
+def copy_import_supported(engine):
+    """True if the engine is PostgreSQL through psycopg2, which the COPY path needs"""
+    return engine.dialect.name == 'postgresql' and engine.dialect.driver == 'psycopg2'
+
+def _create_staging_table(connection):
+    # Temporary and emptied on every commit, so each batch starts from a clean table
+    columns = ',\n'.join(f'{name} {sql_type}' for name, sql_type in STAGING_COLUMNS)
+    connection.execute(text(f"""
+        CREATE TEMPORARY TABLE IF NOT EXISTS {STAGING_TABLE} (
+            {columns},
+            accepted boolean NOT NULL DEFAULT false,
+            container_id integer,
+            client_id integer,
+            vessel_id integer
+        ) ON COMMIT DELETE ROWS
+    """))
+
+def _copy_rows(connection, normalized):
+    """Stream the normalized batch into the staging table with COPY FROM STDIN"""
+    names = [name for name, _ in STAGING_COLUMNS]
+    frame = normalized[names].copy()
+    # A blank BL counts as no BL, same as in ImportLookups
+    frame['bl_number'] = frame['bl_number'].where(frame['bl_number'] != '', None)
+
+    buffer = io.StringIO()
+    frame.to_csv(buffer, header=False, index=False, na_rep='\\N')
+    buffer.seek(0)
+
+    cursor = connection.connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {STAGING_TABLE} ({', '.join(names)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buffer
+        )
+    finally:
+        cursor.close()
+
+def copy_import_batch(connection, normalized, now):
+    """Import one normalized batch with COPY and set-based SQL.
+
+    Applies the same rules as the row-by-row importer: a container number
+    already in the database (or earlier in the file) is only imported again
+    with a new BL number, clients are matched case-insensitively and created
+    when missing, and loaded rows get a load movement when their vessel is
+    found by name and voyage or by name alone. Returns a dict with
+    rows_inserted, rows_skipped, clients_created and vessels_not_found.
+    The caller refreshes container state for ``staged_container_ids`` and
+    commits, which also empties the staging table.
+    """
+    _create_staging_table(connection)
+    _copy_rows(connection, normalized)
+
+    # Duplicates: the first row of a new container number is imported, and
+    # so is the first row of each new (number, BL) pair
+    connection.execute(text(DEDUPE_SQL))
+
+    # Clients: create missing ones once per name (first spelling in the file), then link
+    clients_created = connection.execute(text(f"""
+        INSERT INTO client (name, created_at)
+        SELECT DISTINCT ON (lower(s.client_name)) s.client_name, :now
+        FROM {STAGING_TABLE} s
+        WHERE s.accepted AND s.client_name IS NOT NULL
+          AND lower(s.client_name) NOT IN (SELECT lower(name) FROM client)
+        ORDER BY lower(s.client_name), s.row_number
+    """), {'now': now}).rowcount
+    connection.execute(text(f"""
+        UPDATE {STAGING_TABLE} s
+        SET client_id = c.id
+        FROM (SELECT lower(name) AS name_key, min(id) AS id FROM client GROUP BY lower(name)) c
+        WHERE s.accepted AND lower(s.client_name) = c.name_key
+    """))
+
+    # Vessels for loaded rows: exact name and voyage first, then name alone
+    loaded = "s.accepted AND s.has_status AND s.status = 'loaded' AND s.vessel_info IS NOT NULL"
+    connection.execute(text(f"""
+        UPDATE {STAGING_TABLE} s
+        SET vessel_id = v.id
+        FROM (SELECT lower(name) AS name_key, lower(imo_number) AS voyage_key, min(id) AS id
+              FROM vessel GROUP BY lower(name), lower(imo_number)) v
+        WHERE {loaded}
+          AND lower(s.vessel_name) = v.name_key AND lower(s.voyage_number) = v.voyage_key
+    """))
+    connection.execute(text(f"""
+        UPDATE {STAGING_TABLE} s
+        SET vessel_id = v.id
+        FROM (SELECT lower(name) AS name_key, min(id) AS id FROM vessel GROUP BY lower(name)) v
+        WHERE {loaded} AND s.vessel_id IS NULL AND lower(s.vessel_name) = v.name_key
+    """))
+
+    # Container ids come from the table's sequence up front, so statuses and
+    # movements can reference them without reading anything back
+    rows_inserted = connection.execute(text(f"""
+        UPDATE {STAGING_TABLE} s
+        SET container_id = n.id
+        FROM (
+            SELECT row_number, nextval(pg_get_serial_sequence('container', 'id')) AS id
+            FROM (SELECT row_number FROM {STAGING_TABLE} WHERE accepted ORDER BY row_number) ordered
+        ) n
+        WHERE s.row_number = n.row_number
+    """)).rowcount
+    connection.execute(text(f"""
+        INSERT INTO container (id, container_number, container_type, created_at, loading_port,
+                               final_destination, opr, arrival_date, bl_number, stripping_date, client_id)
+        SELECT container_id, container_number, container_type, :now, loading_port,
+               final_destination, opr, arrival_date, bl_number, stripping_date, client_id
+        FROM {STAGING_TABLE}
+        WHERE accepted
+        ORDER BY row_number
+    """), {'now': now})
+    connection.execute(text(f"""
+        INSERT INTO container_status (status, date, location, notes, created_at, container_id)
+        SELECT status, status_date, status_location, notes, :now, container_id
+        FROM {STAGING_TABLE}
+        WHERE accepted AND has_status
+        ORDER BY row_number
+    """), {'now': now})
+    connection.execute(text(f"""
+        INSERT INTO container_movement (operation_type, operation_date, location, notes, created_at,
+                                        container_id, vessel_id)
+        SELECT 'load', status_date, status_location,
+               'Automatically created from bulk import: ' || COALESCE(NULLIF(notes, ''), 'No notes'),
+               :now, container_id, vessel_id
+        FROM {STAGING_TABLE}
+        WHERE vessel_id IS NOT NULL
+        ORDER BY row_number
+    """), {'now': now})
+
+    vessels_not_found = connection.execute(text(f"""
+        SELECT DISTINCT s.vessel_info FROM {STAGING_TABLE} s WHERE {loaded} AND s.vessel_id IS NULL
+    """)).scalars().all()
+
+    return {
+        'rows_inserted': rows_inserted,
+        'rows_skipped': len(normalized) - rows_inserted,
+        'clients_created': clients_created,
+        'vessels_not_found': set(vessels_not_found),
+    }
@@ -0,0 +1,16 @@
+from app import app, db, ContainerCurrentState, rebuild_container_state
+
+def main():
+    """Create (if needed) and fully rebuild the container_current_state table"""
+    with app.app_context():
+        try:
+            ContainerCurrentState.__table__.create(db.engine, checkfirst=True)
+            count = rebuild_container_state()
+            print(f"Container current state rebuilt for {count} containers")
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error rebuilding container current state: {str(e)}")
+            raise
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+class IntervalScheduler:
+    """Run a job on a fixed interval in a daemon thread.
+
+    The job runs once as soon as the scheduler starts and then every
+    `interval` seconds until stop() is called. Exceptions are logged and the
+    loop carries on, so one failed run never stops later ones. Coordinating
+    between processes or nodes is left to the job itself.
+    """
+    def __init__(self, interval, job, name='interval-scheduler'):
+        self.interval = interval
+        self.job = job
+        self.name = name
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start the background thread (no-op if it is already running)"""
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+        logger.info(f"Started {self.name} (every {self.interval}s)")
+
+    def stop(self, timeout=None):
+        """Ask the thread to finish and wait for it"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def run_forever(self):
+        """Run the loop in the calling thread (used by the CLI worker)"""
+        self._run()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.job()
+            except Exception as e:
+                logger.error(f"{self.name} job failed: {str(e)}")
+            if self._stop.wait(self.interval):
+                break
@@ -0,0 +1,26 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# app.py reads its configuration from the environment when it is imported, so
+# point it at a throwaway SQLite database and keep its background threads off
+DATABASE_DIR = tempfile.mkdtemp(prefix='span_freight_tests_')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(DATABASE_DIR, 'test.db')}"
+os.environ['SCHEDULER_ENABLED'] = 'false'
+os.environ['IMPORT_WORKER_ENABLED'] = 'false'
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app as flask_app, db  # noqa: E402
+
+
+@pytest.fixture
+def app():
+    flask_app.config['TESTING'] = True
+    with flask_app.app_context():
+        db.create_all()
+        yield flask_app
+        db.session.remove()
+        db.drop_all()
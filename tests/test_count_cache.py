@@ -0,0 +1,33 @@
+from datetime import datetime
+
+import pagination
+from app import Client, Container, ContainerStatus, db
+
+
+def cache_a_count():
+    pagination._count_cache['index'] = (10, float('inf'))
+
+
+def test_committed_container_changes_clear_the_cached_counts(app):
+    container = Container(container_number='MSCU0000001', container_type='20GP', bl_number='BL1')
+    db.session.add(container)
+    db.session.commit()
+
+    cache_a_count()
+    db.session.add(ContainerStatus(status='discharged', date=datetime.utcnow(), location='Moroni',
+                                   container_id=container.id))
+    db.session.commit()
+    assert not pagination._count_cache
+
+    cache_a_count()
+    db.session.delete(container)
+    db.session.commit()
+    assert not pagination._count_cache
+
+
+def test_other_commits_keep_the_cached_counts(app):
+    cache_a_count()
+    db.session.add(Client(name='ACME'))
+    db.session.commit()
+    assert pagination._count_cache
+    pagination.clear_count_cache()
@@ -0,0 +1,36 @@
+from app import Container, ContainerCurrentState, db, import_containers_file
+
+
+def import_csv(tmp_path, text, **kwargs):
+    path = tmp_path / 'containers.csv'
+    path.write_text(text)
+    return import_containers_file(str(path), path.name, **kwargs)
+
+
+def test_upsert_of_a_key_repeated_in_one_batch_inserts_it_once(app, tmp_path):
+    stats = import_csv(tmp_path, 'container_number,container_type,bl_number,opr,status,date,location\n'
+                                 'U1,20GP,B1,MSK,discharged,2024-03-01,Moroni\n'
+                                 'U1,20GP,B1,CMA,discharged,2024-03-02,Moroni\n', upsert=True)
+
+    assert (stats['rows_inserted'], stats['rows_updated'], stats['rows_skipped']) == (1, 0, 1)
+    container = Container.query.filter_by(container_number='U1').one()
+    # The later row wins, and the new container gets its status and state rows
+    assert container.opr == 'CMA'
+    assert container.get_current_status().date.day == 2
+    assert db.session.get(ContainerCurrentState, container.id).status == 'discharged'
+
+
+def test_rows_rejected_by_the_database_dont_block_later_rows(app, tmp_path, monkeypatch):
+    # One row per batch, and a trigger standing in for a row the database rejects
+    monkeypatch.setitem(app.config, 'IMPORT_BATCH_SIZE', 1)
+    monkeypatch.setitem(app.config, 'IMPORT_BATCH_MIN_SIZE', 1)
+    db.session.execute(db.text("CREATE TRIGGER reject_container BEFORE INSERT ON container "
+                               "WHEN NEW.opr = 'BAD' BEGIN SELECT RAISE(ABORT, 'rejected'); END"))
+    db.session.commit()
+
+    stats = import_csv(tmp_path, 'container_number,container_type,bl_number,opr\n'
+                                 'U1,20GP,B1,BAD\n'
+                                 'U1,20GP,B1,MSK\n')
+
+    assert (stats['rows_failed'], stats['rows_inserted'], stats['rows_skipped']) == (1, 1, 0)
+    assert Container.query.filter_by(container_number='U1').one().opr == 'MSK'
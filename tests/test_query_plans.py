@@ -0,0 +1,136 @@
+"""The dashboard, report and state queries the app runs must read the container tables through indexes.
+
+Each test runs the real code path, records the SQL it executes and checks the
+SQLite plan of every statement. The schema has no planner statistics, so the
+plans only depend on which indexes exist and whether the queries can use them.
+"""
+import re
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from app import (Client, Container, ContainerMovement, ContainerStatus, User, Vessel, container_sort_keys,
+                 db, filtered_containers_query, keyset_order_by, prefetch_container_state,
+                 refresh_container_state)
+
+# Tables that grow with the number of containers; the small ones (users,
+# clients, vessels) are listed in full by some pages and may be scanned
+CONTAINER_TABLES = {'container', 'container_status', 'container_movement', 'container_current_state'}
+
+
+@pytest.fixture
+def containers(app):
+    """A few containers with statuses and movements on two vessels, one of them departed"""
+    admin = User(username='admin', email='admin@example.com', is_admin=True)
+    admin.set_password('admin')
+    client = Client(name='ACME')
+    arrived = Vessel(name='MSC A', imo_number='V1', vessel_type='container', status='Arrived')
+    departed = Vessel(name='MSC B', imo_number='V2', vessel_type='container', status='Departed')
+    db.session.add_all([admin, client, arrived, departed])
+    db.session.flush()
+
+    now = datetime.utcnow()
+    for i in range(6):
+        container = Container(container_number=f'MSCU{i:07d}', container_type='20GP', bl_number=f'BL{i}',
+                              client_id=client.id, arrival_date=now - timedelta(days=i), created_at=now)
+        db.session.add(container)
+        db.session.flush()
+        db.session.add(ContainerStatus(status='discharged' if i % 2 else 'loaded', date=now,
+                                       location='Moroni', container_id=container.id))
+        db.session.add(ContainerMovement(operation_type='load', operation_date=now, location='Dubai',
+                                         container_id=container.id,
+                                         vessel_id=(departed if i % 3 == 0 else arrived).id))
+    db.session.commit()
+    return Container.query.all()
+
+
+@contextmanager
+def executed_statements():
+    """Record the (sql, parameters) of every statement run inside the block"""
+    statements = []
+
+    def record(connection, cursor, statement, parameters, context, executemany):
+        if not executemany:
+            statements.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+
+
+def full_scans(statement, parameters):
+    """Container tables the plan of a statement reads with a full table scan"""
+    plan = db.session.connection().exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters).fetchall()
+    scanned = set()
+    for row in plan:
+        detail = row[-1]
+        match = re.match(r'SCAN (\w+)', detail)
+        # "SCAN table USING [COVERING] INDEX" walks an index, not the table
+        if match and ' USING ' not in detail:
+            scanned.add(match.group(1))
+    return scanned & CONTAINER_TABLES
+
+
+def assert_no_full_scans(statements):
+    assert statements, 'no statements were recorded'
+    for statement, parameters in statements:
+        assert not full_scans(statement, parameters), statement
+
+
+@pytest.mark.parametrize('location, status, sort_by', [
+    ('Moroni', '', 'arrival_date'),
+    ('Moroni', 'discharged', 'arrival_date'),
+    ('Moroni', 'full', 'created_at'),
+    ('Moroni', 'other', 'status'),
+    ('', 'loaded', 'container_number'),
+])
+def test_dashboard_filters_use_the_state_table_index(containers, location, status, sort_by):
+    query = filtered_containers_query(location, status)
+    with executed_statements() as statements:
+        query.order_by(*keyset_order_by(container_sort_keys(sort_by, 'desc'))).limit(25).all()
+        query.count()
+
+    for statement, parameters in statements:
+        # Without a search term the container table itself is walked in sort
+        # order; the state rows must be reached through their index
+        assert 'container_current_state' not in full_scans(statement, parameters), statement
+
+
+def test_prefetch_container_state_looks_rows_up_by_key(app, containers):
+    with app.test_request_context(), executed_statements() as statements:
+        prefetch_container_state(containers)
+
+    assert_no_full_scans(statements)
+
+
+def test_state_refresh_reads_only_the_refreshed_containers(containers):
+    with executed_statements() as statements:
+        refresh_container_state([container.id for container in containers[:2]])
+
+    assert_no_full_scans(statements)
+
+
+def test_vessel_loaded_containers_use_the_vessel_index(containers):
+    vessel = Vessel.query.filter_by(status='Arrived').one()
+    with executed_statements() as statements:
+        vessel.count_loaded_containers()
+        vessel.propagate_arrival_date(datetime.utcnow())
+
+    assert_no_full_scans(statements)
+
+
+def test_admin_reports_use_indexes(app, containers):
+    client = app.test_client()
+    client.post('/login', data={'username': 'admin', 'password': 'admin'})
+
+    with executed_statements() as statements:
+        response = client.get('/admin/reports')
+    assert response.status_code == 200
+
+    # Substring matches (LIKE '%moroni%') can't use a b-tree index
+    assert_no_full_scans([(statement, parameters) for statement, parameters in statements
+                          if ' LIKE ' not in statement])
@@ -0,0 +1,29 @@
+from datetime import datetime
+
+from app import Container, ContainerCurrentState, ContainerMovement, ContainerStatus, User, Vessel, db
+
+
+def test_deleting_a_vessel_clears_it_from_container_state(app):
+    admin = User(username='admin', email='admin@example.com', is_admin=True)
+    admin.set_password('admin')
+    vessel = Vessel(name='MSC A', imo_number='V1', vessel_type='container', status='Departed')
+    container = Container(container_number='MSCU0000001', container_type='20GP', bl_number='BL1')
+    db.session.add_all([admin, vessel, container])
+    db.session.flush()
+    db.session.add(ContainerStatus(status='loaded', date=datetime.utcnow(), location='Dubai',
+                                   container_id=container.id))
+    db.session.add(ContainerMovement(operation_type='load', operation_date=datetime.utcnow(), location='Dubai',
+                                     container_id=container.id, vessel_id=vessel.id))
+    db.session.commit()
+    # A movement removed outside the ORM leaves the state row pointing at the vessel
+    db.session.execute(ContainerMovement.__table__.delete())
+    db.session.commit()
+    assert db.session.get(ContainerCurrentState, container.id).current_vessel_id == vessel.id
+
+    client = app.test_client()
+    client.post('/login', data={'username': 'admin', 'password': 'admin'})
+    client.post(f'/vessels/{vessel.id}/delete')
+
+    db.session.expire_all()
+    state = db.session.get(ContainerCurrentState, container.id)
+    assert (state.current_vessel_id, state.on_departed_vessel) == (None, False)
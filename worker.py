@@ -0,0 +1,62 @@
+import argparse
+
+from app import (app, run_vessel_status_job, run_import_jobs, release_scheduler_lock,
+                 SCHEDULER_OWNER, VESSEL_STATUS_LOCK)
+from scheduler import IntervalScheduler
+
+JOBS = ['vessels', 'imports']
+
+def main():
+    """Run the scheduled vessel ETA check and queued container imports outside the web processes"""
+    parser = argparse.ArgumentParser(description='Run scheduled background jobs')
+    parser.add_argument('--once', action='store_true',
+                        help='Run the vessel status check and any queued imports once and exit')
+    parser.add_argument('--interval', type=int, default=None,
+                        help='Seconds between vessel status runs (defaults to VESSEL_STATUS_INTERVAL)')
+    parser.add_argument('--jobs', nargs='+', choices=JOBS, default=JOBS,
+                        help='Which jobs to run (default: all)')
+    args = parser.parse_args()
+
+    if args.interval:
+        app.config['VESSEL_STATUS_INTERVAL'] = args.interval
+
+    if args.once:
+        if 'vessels' in args.jobs:
+            ran = run_vessel_status_job()
+            if ran:
+                # Hand the lock straight back so the regular scheduler isn't held off
+                with app.app_context():
+                    release_scheduler_lock(VESSEL_STATUS_LOCK, SCHEDULER_OWNER)
+                print("Vessel status check completed")
+            else:
+                print("Vessel status check skipped: another worker holds the lock")
+        if 'imports' in args.jobs:
+            print(f"Processed {run_import_jobs()} import jobs")
+        return
+
+    schedulers = []
+    if 'vessels' in args.jobs:
+        interval = app.config['VESSEL_STATUS_INTERVAL']
+        print(f"Running vessel status check every {interval} seconds")
+        schedulers.append(IntervalScheduler(interval, run_vessel_status_job, name='vessel-status-worker'))
+    if 'imports' in args.jobs:
+        interval = app.config['IMPORT_POLL_INTERVAL']
+        print(f"Checking for queued imports every {interval} seconds")
+        schedulers.append(IntervalScheduler(interval, run_import_jobs, name='import-worker'))
+    print("Press Ctrl+C to stop")
+
+    # Extra jobs run in background threads, the last one in this thread
+    for scheduler in schedulers[:-1]:
+        scheduler.start()
+    try:
+        schedulers[-1].run_forever()
+    except KeyboardInterrupt:
+        for scheduler in schedulers[:-1]:
+            scheduler.stop(timeout=5)
+        if 'vessels' in args.jobs:
+            with app.app_context():
+                release_scheduler_lock(VESSEL_STATUS_LOCK, SCHEDULER_OWNER)
+        print("Stopped")
+
+if __name__ == '__main__':
+    main()